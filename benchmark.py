@@ -0,0 +1,279 @@
+import argparse
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+# The mirrors and journal write under the cache dir; keep the
+# benchmark's copies out of the app's .sheet_cache
+CACHE_ROOT = tempfile.mkdtemp(prefix="spending-bench-")
+os.environ["SPENDING_CACHE_DIR"] = CACHE_ROOT
+
+from gspread.utils import a1_to_rowcol, numericise_all
+from charts import MAX_POINTS, binned_series, box_stats
+from dateindex import period_range
+from ledger import Ledger
+from spatial import cluster_levels, find_hotspots
+from storage import SPENDING_HEADERS, META_HEADERS, SheetsBackend, SQLiteBackend, format_sheet_date
+
+# --- IN-MEMORY SHEETS STAND-IN ---
+# Implements the slice of the gspread Worksheet/Spreadsheet API the app uses.
+# Every call sleeps `latency` seconds and is counted, with the cells it returns.
+class FakeWorksheet:
+    def __init__(self, title, values, spreadsheet):
+        self.title = title
+        self.values = values
+        self.spreadsheet = spreadsheet
+
+    def _rows(self, start=1, end=None):
+        return [list(row) for row in self.values[start - 1:end]]
+
+    def _fetch(self, start=1):
+        rows = self._rows(start)
+        self.spreadsheet._call(rows)
+        return rows
+
+    def get_all_values(self, **kwargs):
+        return self._fetch()
+
+    def get_all_records(self, expected_headers=None, **kwargs):
+        rows = self._fetch()
+        return [dict(zip(rows[0], numericise_all(row))) for row in rows[1:]]
+
+    def get(self, range_name=None, **kwargs):
+        if not range_name:
+            return self._fetch()
+        return self._fetch(a1_to_rowcol(range_name.split("!")[-1].split(":")[0])[0])
+
+    def append_row(self, row, **kwargs):
+        self.append_rows([row])
+
+    def append_rows(self, rows, **kwargs):
+        rows = [[str(value) for value in row] for row in rows]
+        self.spreadsheet._call([])
+        self.values.extend(rows)
+        self.spreadsheet.modified += 1
+
+
+class FakeSpreadsheet:
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.sheets = {}
+        self.calls = 0
+        self.cells = 0
+        self.modified = 0
+
+    def _call(self, rows):
+        self.calls += 1
+        self.cells += sum(len(row) for row in rows)
+        if self.latency:
+            time.sleep(self.latency)
+
+    def add_worksheet(self, title, values):
+        self.sheets[title] = FakeWorksheet(title, values, self)
+        return self.sheets[title]
+
+    def worksheet(self, title):
+        return self.sheets[title]
+
+    # Drive modifiedTime stand-in: changes on every append
+    def get_lastUpdateTime(self):
+        self._call([])
+        return f"rev-{self.modified}"
+
+    def values_batch_get(self, ranges, params=None):
+        value_ranges = []
+        for a1_range in ranges:
+            title, _, cells = a1_range.partition("!")
+            sheet = self.sheets[title.strip("'")]
+            first, _, last = cells.partition(":")
+            start = a1_to_rowcol(first)[0] if first else 1
+            # "A5:I" runs to the end of the sheet; "A5:I5" is one row
+            end = int(last.lstrip("ABCDEFGHIJKLMNOPQRSTUVWXYZ")) if last[-1:].isdigit() else None
+            value_ranges.append({"range": a1_range, "values": sheet._rows(start, end)})
+        self._call([row for value_range in value_ranges for row in value_range["values"]])
+        return {"valueRanges": value_ranges}
+
+
+# --- SYNTHETIC LEDGERS ---
+# (items, price range) per category; categories match the app's budgets
+CATALOGUE = {
+    "Food": (["rice", "jollof rice", "bread", "amala", "shawarma", "indomie"], (500, 4000)),
+    "Foodstuff": (["garri", "beans", "palm oil", "yam", "tomatoes", "pepper"], (1000, 25000)),
+    "Snacks": (["gala", "chin chin", "plantain chips", "coke", "malt"], (200, 1500)),
+    "transport": (["bus", "bolt", "okada", "keke"], (300, 5000)),
+    "Data": (["mtn data", "airtel data", "glo data"], (1000, 5000)),
+    "Airtime": (["mtn airtime", "airtel airtime"], (100, 1000)),
+    "Bill": (["nepa", "dstv", "water"], (2000, 20000)),
+    "Bet": (["sporty", "bet9ja"], (100, 2000)),
+    "Object": (["charger", "slippers", "soap", "detergent"], (500, 15000)),
+    "Money": (["gift", "church offering"], (500, 5000)),
+    "transfer": (["transfer to mum", "transfer to friend"], (2000, 50000)),
+    "income": (["salary", "freelance"], (50000, 300000)),
+    "Savings": (["piggyvest", "cowrywise"], (5000, 50000)),
+}
+CATEGORY_WEIGHTS = [30, 10, 20, 20, 5, 5, 2, 2, 3, 1, 1, 0.5, 0.5]
+
+# (LOCATION, LAT, LON) around Lagos; fixes are jittered by ~200 m
+PLACES = [
+    ("Yaba Market", 6.5095, 3.3711), ("Ikeja City Mall", 6.6142, 3.3579),
+    ("Lekki Phase 1", 6.4474, 3.4723), ("Obalende", 6.4487, 3.4025),
+    ("Surulere", 6.5000, 3.3500), ("Home", 6.5244, 3.3792),
+]
+PAYMENT_TYPES = ["Cash", "Transfer", "Card", "POS"]
+
+
+def generate(n, seed=0, per_day=20, meta_ratio=0.9):
+    rng = random.Random(seed)
+    days = max(30, n // per_day)
+    start = date.today() - timedelta(days=days - 1)
+    categories = list(CATALOGUE)
+    spending, meta = [list(SPENDING_HEADERS)], [list(META_HEADERS)]
+    previous, no = None, 0
+    for i in range(n):
+        day = start + timedelta(days=i * days // n)
+        no = no + 1 if day == previous else 1
+        previous = day
+        category = rng.choices(categories, CATEGORY_WEIGHTS)[0]
+        items, (low, high) = CATALOGUE[category]
+        qty = rng.choice([1, 1, 1, 2, 3])
+        week_start = day - timedelta(days=day.weekday())
+        spending.append([
+            format_sheet_date(day), str(no), f"{rng.randint(6, 22)}:{rng.randint(0, 59):02d}",
+            rng.choice(items), category, str(qty), str(qty * rng.randrange(low, high, 50)),
+            f"{week_start.day}-{day.strftime('%b')}", day.strftime("%B %Y"),
+        ])
+        if rng.random() < meta_ratio:
+            place, lat, lon = rng.choice(PLACES)
+            meta.append([
+                format_sheet_date(day), str(no), place,
+                f"{lat + rng.gauss(0, 0.002):.6f}", f"{lon + rng.gauss(0, 0.002):.6f}", rng.choice(PAYMENT_TYPES),
+            ])
+    return spending, meta
+
+
+# --- RUNNER ---
+def measure(setup, fn, memory=True):
+    setup()
+    started = time.perf_counter()
+    fn()
+    seconds = time.perf_counter() - started
+    peak = None
+    if memory:
+        setup()
+        tracemalloc.start()
+        fn()
+        peak = tracemalloc.get_traced_memory()[1] / 2 ** 20
+        tracemalloc.stop()
+    return seconds, peak
+
+
+def steps_for(n, backend, latency):
+    # Mirrors, journal and database of each run stay apart, so no step
+    # depends on another size having run first
+    cache_dir = os.path.join(CACHE_ROOT, f"{backend}-{n}")
+    os.makedirs(cache_dir, exist_ok=True)
+    spending, meta = generate(n)
+    book = FakeSpreadsheet(latency)
+    if backend == "sqlite":
+        storage = SQLiteBackend(os.path.join(cache_dir, "spending.db"))
+        storage.append(spending[1:], meta[1:])
+    else:
+        spending_ws = book.add_worksheet("My Spending Sheet", spending)
+        meta_ws = book.add_worksheet("TransactionMeta", meta)
+        storage = SheetsBackend(spending_ws, meta_ws, cache_dir)
+    ledger = Ledger(storage)
+    today = date.today()
+    last_month = today.replace(day=1) - timedelta(days=1)
+    row = spending[-1][:1] + [str(int(spending[-1][1]) + 1)] + spending[-1][2:]
+    meta_row = [row[0], row[1], "Home", "6.5244", "3.3792", "Cash"]
+
+    def cold():
+        storage.reset()
+
+    def nothing():
+        pass
+
+    # Rows another device appended since the last load
+    def append_elsewhere():
+        if backend == "sheets":
+            spending_ws.append_rows([row])
+            meta_ws.append_rows([meta_row])
+        else:
+            storage.append([row], [meta_row])
+
+    def week():
+        return ledger.date_index.select(ledger.frame, *period_range("week", today))
+
+    def month_joined():
+        return ledger.date_index.select(ledger.joined, *period_range("month", today))
+
+    def range_totals():
+        return [ledger.date_index.total(*period_range(period, today)) for period in ("today", "week", "month")]
+
+    def queue_transaction():
+        storage.append([row], [meta_row])
+        ledger.apply([row], [meta_row])
+
+    return book, storage, [
+        ("reload (cold)", cold, ledger.reload),
+        ("reload (unchanged)", nothing, ledger.reload),
+        ("reload (tail)", append_elsewhere, ledger.reload),
+        ("rollup totals", nothing, lambda: (ledger.rollup.day_total(today), ledger.rollup.week_total(today),
+                                           ledger.rollup.month_total(today))),
+        ("range totals", nothing, range_totals),
+        ("range query (Food)", nothing,
+         lambda: ledger.date_index.select(ledger.frame, today - timedelta(days=90), today, category="Food")),
+        ("month frame", nothing, lambda: ledger.month_frame(last_month.year, last_month.month)),
+        ("binned series", nothing, lambda: binned_series(ledger.frame, by="ITEM CATEGORY", max_points=MAX_POINTS)),
+        ("box stats (week)", nothing, lambda: box_stats(week())),
+        ("map clusters (month)", nothing, lambda: cluster_levels(month_joined())),
+        ("hotspots (month)", nothing, lambda: find_hotspots(month_joined())),
+        ("complete 'ri'", nothing, lambda: ledger.item_index.complete("ri")),
+        ("recommend", nothing, lambda: ledger.recommender.recommend(today.weekday(), 12)),
+        ("nearest place", nothing, lambda: ledger.place_index.nearest(6.5097, 3.3709)),
+        ("orphans", nothing, ledger.orphans),
+        ("queue transaction", nothing, queue_transaction),
+    ]
+
+
+def run(sizes, backend="sheets", latency=0.0, memory=True):
+    results = []
+    for n in sizes:
+        book, storage, steps = steps_for(n, backend, latency)
+        for name, setup, fn in steps:
+            calls, received = book.calls, book.cells
+            seconds, peak = measure(setup, fn, memory)
+            results.append({
+                "rows": n, "step": name, "seconds": round(seconds, 6),
+                "peak_mb": None if peak is None else round(peak, 2),
+                "sheet_calls": book.calls - calls, "sheet_cells": book.cells - received,
+            })
+            print(f"{n:>9,} {name:<22} {seconds * 1000:>10.1f} ms"
+                  + ("" if peak is None else f" {peak:>9.1f} MB")
+                  + f" {book.calls - calls:>4} calls", flush=True)
+        # Deliver queued rows now, so they don't replay into the next size's sheets
+        if backend == "sheets":
+            storage.journal.flush()
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time the ledger and page computations on synthetic data.")
+    parser.add_argument("--sizes", default="10000,100000", help="comma-separated transaction counts")
+    parser.add_argument("--backend", choices=["sheets", "sqlite"], default="sheets")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to each fake Sheets call")
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc pass")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+    try:
+        results = run([int(n) for n in args.sizes.split(",")], args.backend, args.latency, not args.no_memory)
+        if args.json:
+            with open(args.json, "w") as f:
+                json.dump(results, f, indent=2)
+    finally:
+        shutil.rmtree(CACHE_ROOT, ignore_errors=True)
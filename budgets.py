@@ -0,0 +1,60 @@
+import calendar
+from bisect import bisect_right
+from datetime import date
+import numpy as np
+import pandas as pd
+from rollups import NON_SPENDING
+
+# Share of a budget used before a category is flagged
+WARN_AT = 0.75
+
+
+# --- BUDGET HISTORY ---
+# Budgets keyed by the (year, month) they take effect; each version applies
+# until the next one, so past months keep the budgets they had.
+class BudgetBook:
+    def __init__(self, history):
+        self.history = dict(history)
+        self.months = sorted(self.history)
+
+    def for_month(self, year, month):
+        i = bisect_right(self.months, (year, month)) - 1
+        return self.history[self.months[max(i, 0)]]
+
+
+# {"2025-06": {"Food": 45000, ...}} (as written in secrets.toml) -> {(2025, 6): {...}}
+def parse_versions(raw):
+    versions = {}
+    for key, budgets in dict(raw).items():
+        year, month = (int(part) for part in str(key).split("-"))
+        versions[(year, month)] = {category: float(amount) for category, amount in dict(budgets).items()}
+    return versions
+
+
+# --- BUDGET REPORT ---
+# Utilization, remaining amount, daily burn rate, month-end projection and
+# alert level for every budgeted category at once. `spent` is spend per
+# category (any case), e.g. one groupby over the month's expenses.
+def budget_report(spent, budgets, year, month, today=None):
+    today = today or date.today()
+    days = calendar.monthrange(year, month)[1]
+    if (year, month) == (today.year, today.month):
+        elapsed = today.day
+    else:
+        elapsed = days if (year, month) < (today.year, today.month) else 0
+
+    spent = pd.Series(spent, dtype=float)
+    spent = spent.groupby(spent.index.astype(str).str.strip().str.lower()).sum()
+    report = pd.DataFrame({"Category": list(budgets), "Budget": [float(b) for b in budgets.values()]})
+    keys = report["Category"].str.lower()
+    report = report[~keys.isin(NON_SPENDING)].reset_index(drop=True)
+    report["Spent"] = report["Category"].str.lower().map(spent).fillna(0.0)
+    report["Remaining"] = report["Budget"] - report["Spent"]
+    report["Utilization"] = np.where(report["Budget"] > 0, report["Spent"] / report["Budget"].where(report["Budget"] > 0), 0.0)
+    report["Burn Rate"] = report["Spent"] / elapsed if elapsed else 0.0
+    report["Projected"] = report["Burn Rate"] * days
+    report["Alert"] = np.select(
+        [report["Spent"] > report["Budget"], report["Utilization"] > WARN_AT],
+        ["over", "warning"], "ok"
+    )
+    return report
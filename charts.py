@@ -0,0 +1,87 @@
+import numpy as np
+import pandas as pd
+
+# Points per series for charts that span many months; longer series are downsampled
+MAX_POINTS = 400
+
+# (longest span in days, period): daily bins for a few months, weekly for a
+# couple of years, monthly beyond that
+BIN_RULES = [(120, "D"), (730, "W"), (None, "M")]
+
+
+def bin_period(start, end):
+    span = (end - start).days
+    for limit, period in BIN_RULES:
+        if limit is None or span <= limit:
+            return period
+
+
+# --- LTTB DOWNSAMPLING ---
+# Largest-Triangle-Three-Buckets: keeps the first and last points and, per
+# bucket, the point forming the largest triangle with the previously kept
+# point and the next bucket's average, so peaks and dips survive.
+def lttb(x, y, threshold):
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    keep = [0]
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x, avg_y = x[end:next_end].mean(), y[end:next_end].mean()
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        keep.append(a)
+    keep.append(n - 1)
+    return np.array(keep)
+
+
+def downsample(df, x="DATE", y="Amount Spent", by=None, max_points=MAX_POINTS):
+    if df.empty or max_points is None:
+        return df
+    groups = [df] if by is None else [g for _, g in df.groupby(by, observed=True, sort=False)]
+    parts = []
+    for group in groups:
+        group = group.sort_values(x)
+        xs = group[x].astype("int64") if pd.api.types.is_datetime64_any_dtype(group[x]) else group[x]
+        parts.append(group.iloc[lttb(xs.to_numpy(), group[y].to_numpy(), max_points)])
+    return pd.concat(parts, ignore_index=True)
+
+
+# --- BINNED SERIES ---
+# Sums `value` per time bin (and per `by` column), with the bin chosen from
+# the span of the data. Pass max_points to downsample each series as well;
+# a single month never has enough bins to need it.
+def binned_series(df, value="Amount Spent", by=None, date_col="DATE", max_points=None):
+    keys = [by] if isinstance(by, str) else list(by or [])
+    df = df.dropna(subset=[date_col])
+    if df.empty:
+        return pd.DataFrame(columns=[date_col] + keys + [value])
+    period = bin_period(df[date_col].min(), df[date_col].max())
+    bins = df[date_col].dt.normalize() if period == "D" else df[date_col].dt.to_period(period).dt.start_time
+    binned = df.groupby([bins.rename(date_col)] + keys, observed=True)[value].sum().reset_index()
+    return downsample(binned, date_col, value, keys or None, max_points)
+
+
+# --- BOX PLOT STATISTICS ---
+# Quartiles, Tukey whiskers (furthest values within 1.5 IQR) and outliers per
+# group, computed with grouped quantiles instead of a plotting library
+def box_stats(df, value="Amount Spent", by="ITEM CATEGORY"):
+    df = df.dropna(subset=[by, value])
+    if df.empty:
+        return pd.DataFrame(columns=[by, "q1", "median", "q3", "lower", "upper"]), df.iloc[:0]
+    grouped = df.groupby(by, observed=True)[value]
+    stats = grouped.quantile([0.25, 0.5, 0.75]).unstack()
+    stats.columns = ["q1", "median", "q3"]
+    iqr = stats["q3"] - stats["q1"]
+    low = df[by].map(stats["q1"] - 1.5 * iqr).astype(float)
+    high = df[by].map(stats["q3"] + 1.5 * iqr).astype(float)
+    inside = df[value].between(low, high)
+    within = df[inside].groupby(by, observed=True)[value]
+    stats["lower"] = within.min()
+    stats["upper"] = within.max()
+    return stats.reset_index(), df.loc[~inside, [by, value]]
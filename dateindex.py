@@ -0,0 +1,121 @@
+import calendar
+from datetime import date, timedelta
+import numpy as np
+import pandas as pd
+from rollups import NON_SPENDING
+
+
+# --- PERIODS ---
+# Inclusive (start, end) dates; weeks start on Monday and are plain date
+# arithmetic, so a week spanning two months (or years) is still one week
+def period_range(period, today=None):
+    today = today or date.today()
+    if period == "today":
+        return today, today
+    if period == "week":
+        return today - timedelta(days=today.weekday()), today
+    if period == "month":
+        return today.replace(day=1), today.replace(day=calendar.monthrange(today.year, today.month)[1])
+    return None, None
+
+
+def _day_numbers(dates):
+    return pd.to_datetime(pd.Series(dates)).to_numpy().astype("datetime64[D]").astype(np.int64)
+
+
+def _day_number(day):
+    return np.datetime64(pd.Timestamp(day).date(), "D").astype(np.int64)
+
+
+def _key(value):
+    return str(value).strip().lower()
+
+
+# Lower-cased values; a categorical column is lowered once per category
+def _lowered(values):
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        names = values.cat.categories.astype(str).str.strip().str.lower().to_numpy(dtype=object)
+        return np.append(names, "")[values.cat.codes.to_numpy()]
+    return values.astype(str).str.strip().str.lower().to_numpy(dtype=object)
+
+
+# --- DATE INDEX ---
+# Transactions sorted by day with running totals of Amount Spent: a range
+# is two binary searches and a range sum is one subtraction. Positions refer
+# to rows of the indexed frame (and of any frame row-aligned with it, such
+# as the joined view). Category and item filters use their own sorted
+# arrays, built the first time each is asked for.
+class DateIndex:
+    def __init__(self, days, amounts, categories, items, positions, presorted=False):
+        order = slice(None) if presorted else np.argsort(days, kind="stable")
+        self.days = days[order]
+        self.amounts = amounts[order]
+        self.categories = categories[order]
+        self.items = items[order]
+        self.order = positions[order]
+        spending = np.where(np.isin(self.categories, NON_SPENDING), 0.0, self.amounts)
+        self.spend_prefix = np.concatenate([[0.0], np.cumsum(spending)])
+        self._groups = {}
+
+    @classmethod
+    def from_frame(cls, df, offset=0):
+        valid = df["DATE"].notna().to_numpy()
+        rows = df[valid]
+        return cls(
+            _day_numbers(rows["DATE"]),
+            pd.to_numeric(rows["Amount Spent"], errors="coerce").fillna(0.0).to_numpy(dtype=float),
+            _lowered(rows["ITEM CATEGORY"]),
+            _lowered(rows["ITEM"]),
+            np.flatnonzero(valid) + offset,
+        )
+
+    # Index over the frame with `new_frame` appended after its last row; rows
+    # dated on or after the last indexed day need no re-sort
+    def extended(self, new_frame, offset):
+        new = DateIndex.from_frame(new_frame, offset)
+        in_order = not len(self.days) or not len(new.days) or new.days[0] >= self.days[-1]
+        return DateIndex(
+            np.concatenate([self.days, new.days]), np.concatenate([self.amounts, new.amounts]),
+            np.concatenate([self.categories, new.categories]), np.concatenate([self.items, new.items]),
+            np.concatenate([self.order, new.order]), presorted=in_order,
+        )
+
+    # Sorted days, running totals and frame positions for the filters given
+    def _arrays(self, category, item):
+        if category is None and item is None:
+            return self.days, self.spend_prefix, self.order
+        key = (None if category is None else _key(category), None if item is None else _key(item))
+        if key not in self._groups:
+            mask = np.ones(len(self.days), dtype=bool)
+            if key[0] is not None:
+                mask &= self.categories == key[0]
+            if key[1] is not None:
+                mask &= self.items == key[1]
+            self._groups[key] = (self.days[mask], np.concatenate([[0.0], np.cumsum(self.amounts[mask])]), self.order[mask])
+        return self._groups[key]
+
+    def _bounds(self, days, start, end):
+        lo = 0 if start is None else np.searchsorted(days, _day_number(start), "left")
+        hi = len(days) if end is None else np.searchsorted(days, _day_number(end), "right")
+        return lo, max(lo, hi)
+
+    # Frame positions of rows dated start..end (inclusive), in frame order
+    def positions(self, start=None, end=None, category=None, item=None):
+        days, _, order = self._arrays(category, item)
+        lo, hi = self._bounds(days, start, end)
+        return np.sort(order[lo:hi])
+
+    def select(self, df, start=None, end=None, category=None, item=None):
+        return df.iloc[self.positions(start, end, category, item)]
+
+    # Amount Spent over start..end; with no category or item filter,
+    # savings and income are left out like the rollup totals
+    def total(self, start=None, end=None, category=None, item=None):
+        days, prefix, _ = self._arrays(category, item)
+        lo, hi = self._bounds(days, start, end)
+        return float(prefix[hi] - prefix[lo])
+
+    def count(self, start=None, end=None, category=None, item=None):
+        days, _, _ = self._arrays(category, item)
+        lo, hi = self._bounds(days, start, end)
+        return int(hi - lo)
@@ -1,27 +1,30 @@
 import streamlit as st
+from perf import start_rerun, mark, finish_rerun, timed_fragment
 from streamlit_geolocation import streamlit_geolocation
 from shared import (
-    category_budgets, Spending_Sheet, Meta_Sheet,
-    load_all_data, load_item_category_map,
-    get_today_count, recommend_items_for_today,
-    refresh_data, save_transaction_metadata, load_transaction_metadata
+    category_budgets, complete_items, predict_category,
+    allocate_numbers, recommend_items_for_today, refresh_data,
+    queue_transaction, get_pending_count, load_metadata_frame, nearest_place,
+    load_joined_transactions, get_data_as_of
 )
 from datetime import datetime, timedelta
 import pandas as pd
 import re
 
 st.set_page_config(page_title="Spending Tracker - Entry", layout="wide")
+start_rerun("home")
 
 # --- Refresh Button ---
+mark("Refresh Button")
 if st.button("🔄 Refresh Data"):
     refresh_data()
+st.caption(get_data_as_of())
 
-# --- Load Existing Data ---
-df = pd.DataFrame(load_all_data())
 st.title("💸 Spending Tracker")
 st.markdown("---")
 
 # --- All Checkboxes Outside Form ---
+mark("All Checkboxes Outside Form")
 col1, col2, col3 = st.columns(3)
 with col1:
     use_current_time = st.checkbox("🕒 Use Current Time (UTC+1)", value=False)
@@ -31,6 +34,7 @@ with col3:
     manual_entry = st.checkbox("📝 Enter total amount manually?", key="manual_toggle")
 
 # --- Get Geolocation ---
+mark("Get Geolocation")
 st.markdown("#### 📡 Getting GPS Location...")
 location = streamlit_geolocation()
 
@@ -44,7 +48,42 @@ if lat is not None and lon is not None:
 else:
     st.warning("⚠ Could not retrieve GPS coordinates. Please allow location access.")
 
+# --- Item Search ---
+# Outside the form so suggestions update as you type, and a fragment so
+# typing only reruns the search and its suggestions. It is drawn into
+# search_box after the form, so the form renders before any Sheets call.
+def use_suggestion(suggestion):
+    # Runs before the next rerun, so the form widgets pick up the prefill
+    st.session_state["prefill_item"] = suggestion["item"]
+    if suggestion["unit_price"]:
+        st.session_state["unit_price"] = float(suggestion["unit_price"])
+
+@st.fragment
+@timed_fragment("home: item search")
+def item_search():
+    mark("Item Search")
+    item_query = st.text_input("🔎 Find Item", key="item_query", placeholder="Start typing an item name...")
+    if item_query:
+        suggestions = complete_items(item_query)
+        if not suggestions:
+            st.caption("No matching items yet.")
+    else:
+        suggestions = [s for name in recommend_items_for_today() for s in complete_items(name, limit=1)]
+        if suggestions:
+            st.caption("💡 Usually bought around now")
+    if suggestions:
+        for col, s in zip(st.columns(len(suggestions)), suggestions):
+            label = f"{s['item']} · {s['category'] or '—'}"
+            if s["unit_price"]:
+                label += f" · ₦{s['unit_price']:,.0f}"
+            if col.button(label, key=f"suggest_{s['item']}", on_click=use_suggestion, args=(s,)):
+                # The form is outside the fragment; rerun the page to prefill it
+                st.rerun()
+
+search_box = st.container()
+
 # --- Transaction Form ---
+mark("Transaction Form")
 with st.form("entry_form", clear_on_submit=True):
     # Prefill time if checkbox is checked
     if use_current_time:
@@ -61,9 +100,8 @@ with st.form("entry_form", clear_on_submit=True):
     
     item = st.text_input("🛒 Item", value=st.session_state.get("prefill_item", "")).strip()
 
-    # Category Prediction
-    item_map = load_item_category_map()
-    predicted = item_map.get(item.lower(), "Select Category")
+    # Category Prediction (history is only loaded once an item is typed)
+    predicted = (predict_category(item) if item else None) or "Select Category"
     categories = ["Select Category"] + list(category_budgets.keys())
     category = st.radio("📂 Category", categories, index=categories.index(predicted) if predicted in categories else 0, horizontal=True)
 
@@ -83,8 +121,8 @@ with st.form("entry_form", clear_on_submit=True):
     # Location Input (after payment type)
     if use_last_location:
         last_location = st.session_state.get("last_location", "")
-        if not last_location and not df.empty:
-            meta_df = pd.DataFrame(load_transaction_metadata())
+        if not last_location:
+            meta_df = load_metadata_frame()
             if not meta_df.empty:
                 last_location = meta_df.iloc[-1]["LOCATION"]
         location_name = st.text_input(
@@ -93,11 +131,26 @@ with st.form("entry_form", clear_on_submit=True):
             disabled=True
         )
     else:
-        location_name = st.text_input("📍 Location")
+        # Prefilled with the closest place recorded near this GPS fix
+        place = nearest_place(lat, lon)
+        prefill = place[0] if place else ""
+        # Follow the GPS only while the field still holds our last suggestion,
+        # and only write when it changes so a rerun doesn't reset what's typed
+        current = st.session_state.get("location_input", "")
+        if current in ("", st.session_state.get("location_prefill")) and current != prefill:
+            st.session_state["location_input"] = prefill
+            st.session_state["location_prefill"] = prefill
+        location_name = st.text_input("📍 Location", key="location_input")
+        if place:
+            st.caption(f"📍 Known place {place[1]:.0f} m away")
     
     submitted = st.form_submit_button("✅ Submit")
 
+with search_box:
+    item_search()
+
 # --- Handle Submission ---
+mark("Handle Submission")
 if submitted:
     if not re.fullmatch(r"[0-9]{1,2}:[0-9]{2}", time_input):
         st.warning("⚠ Invalid time format (HH:MM).")
@@ -113,20 +166,18 @@ if submitted:
         st.warning("⚠ Could not retrieve GPS coordinates. Please allow location access.")
     else:
         DATE = f"{selected_date.month}/{selected_date.day}/{selected_date.year}"
-        NO = get_today_count() + 1
+        NO = allocate_numbers(selected_date)
 
-        # Save to Sheets
-        Spending_Sheet.append_row([
+        # Queue for both sheets; the journal flushes them in the background
+        queue_transaction([
             DATE, NO, time_input, item, category, qty, amount,
             f"{(datetime.now().date() - timedelta(days=datetime.now().weekday())).day}-{datetime.now().strftime('%b')}",
             datetime.now().strftime("%B %Y")
-        ])
-        save_transaction_metadata(DATE, NO, location_name, lat, lon, payment_type)
+        ], [DATE, NO, location_name, lat, lon, payment_type])
 
         # Store last location in session state
         st.session_state["last_location"] = location_name
 
-        st.cache_data.clear()
         st.success("✅ Transaction submitted!")
 
         # Confirmation sound
@@ -149,16 +200,16 @@ if submitted:
 st.markdown("---")
 
 # --- TODAY'S TRANSACTIONS ---
+mark("TODAY'S TRANSACTIONS")
 st.markdown("### 📋 Today's Transactions")
 
-today_str = f"{datetime.now().month}/{datetime.now().day}/{datetime.now().year}"
-df_today = df[df["DATE"] == today_str]
+pending_count = get_pending_count()
+if pending_count:
+    st.caption(f"⏳ {pending_count} transaction(s) waiting to sync to Google Sheets")
 
-# Load metadata and merge to get LOCATION
-meta_df = pd.DataFrame(load_transaction_metadata())
-meta_df["No"] = meta_df["No"].astype(str)
-df_today["No"] = df_today["No"].astype(str)
-df_today_loc = pd.merge(df_today, meta_df[["DATE", "No", "LOCATION"]], on=["DATE", "No"], how="left")
+# Transactions already joined with their metadata (LOCATION)
+joined_df = load_joined_transactions()
+df_today_loc = joined_df[joined_df["DATE"] == pd.Timestamp(datetime.now().date())]
 
 if not df_today_loc.empty:
     st.dataframe(
@@ -167,4 +218,5 @@ if not df_today_loc.empty:
         hide_index=True
     )
 else:
-    st.info("ℹ No transactions recorded yet today.")
\ No newline at end of file
+    st.info("ℹ No transactions recorded yet today.")
+finish_rerun()
@@ -0,0 +1,140 @@
+import re
+import pandas as pd
+from items import normalize
+
+# Rows parsed per chunk when reading a statement
+CHUNK_ROWS = 5000
+
+# Lower-cased header names banks commonly use for each field
+COLUMN_NAMES = {
+    "date": ["transaction date", "trans. date", "trans date", "date", "value date", "posting date"],
+    "description": ["description", "narration", "details", "remarks", "transaction details", "memo", "item"],
+    "amount": ["amount", "transaction amount"],
+    "debit": ["debit", "debits", "withdrawal", "withdrawals", "money out", "dr"],
+    "credit": ["credit", "credits", "deposit", "deposits", "money in", "cr"],
+}
+
+
+# --- COLUMN DETECTION ---
+def detect_columns(header):
+    lowered = {str(name).strip().lower(): name for name in header}
+    found = {}
+    for field, candidates in COLUMN_NAMES.items():
+        found[field] = next((lowered[c] for c in candidates if c in lowered), None)
+    return found
+
+
+# An optional opening parenthesis or sign, the number, an optional trailing
+# minus or closing parenthesis, then an optional CR/DR marker
+MONEY_PATTERN = r"^(\()?([-+])?(\d+(?:\.\d*)?|\.\d+)(-)?(\))?(CR|DR)?$"
+BLANKS = ["", "-", "—", "NAN", "NONE"]
+
+
+# Signed amounts from bank-formatted text: "(500)", "500-" and "500 DR" are
+# negative, "500 CR" positive. A value with more than one sign marker, an
+# unmatched parenthesis or anything else left over is refused instead of
+# guessed; the second Series flags those rows.
+def _money(values):
+    text = values.fillna("").astype(str).str.upper().str.replace(r"[\s,₦$£€]|NGN|USD", "", regex=True)
+    opened, sign, number, trailing, closed, marker = (part for _, part in text.str.extract(MONEY_PATTERN).items())
+    markers = opened.notna().astype(int) + sign.notna() + trailing.notna() + marker.notna()
+    negative = opened.notna() | (sign == "-") | trailing.notna() | (marker == "DR")
+    amount = pd.to_numeric(number, errors="coerce")
+    rejected = ~text.isin(BLANKS) & (number.isna() | (opened.notna() != closed.notna()) | (markers > 1))
+    return amount.mask(negative, -amount).mask(rejected), rejected
+
+
+# --- STREAMING PARSE ---
+# Reads the CSV in chunks and keeps only DATE, ITEM, Amount Spent and
+# whether each row is money in; debits become positive spending amounts.
+# Returns the parsed rows and the raw rows whose amount was refused.
+def read_statement(file, columns, dayfirst=True, chunk_rows=CHUNK_ROWS):
+    parts, refused = [], []
+    for chunk in pd.read_csv(file, chunksize=chunk_rows, dtype=str, skipinitialspace=True):
+        dates = pd.to_datetime(chunk[columns["date"]], dayfirst=dayfirst, errors="coerce", format="mixed")
+        if columns.get("amount"):
+            signed, rejected = _money(chunk[columns["amount"]])
+        else:
+            # The column says which way the money went; a marker there only repeats it
+            signed, rejected = 0, pd.Series(False, index=chunk.index)
+            for field, direction in (("credit", 1), ("debit", -1)):
+                if columns.get(field):
+                    amount, bad = _money(chunk[columns[field]])
+                    signed = signed + direction * amount.abs().fillna(0)
+                    rejected = rejected | bad
+        part = pd.DataFrame({
+            "DATE": dates,
+            "ITEM": chunk[columns["description"]].fillna("").astype(str).str.strip(),
+            "Amount Spent": signed.abs(),
+            "Credit": signed > 0,
+        })
+        refused.append(chunk[rejected])
+        parts.append(part[~rejected].dropna(subset=["DATE", "Amount Spent"]).query("`Amount Spent` > 0"))
+    refused = pd.concat(refused, ignore_index=True) if refused else pd.DataFrame()
+    if not parts:
+        return pd.DataFrame(columns=["DATE", "ITEM", "Amount Spent", "Credit"]), refused
+    df = pd.concat(parts, ignore_index=True)
+    # An amount column with no negative values is unsigned: all spending
+    if columns.get("amount") and df["Credit"].all():
+        df["Credit"] = False
+    return df, refused
+
+
+# --- CATEGORIZATION ---
+# Exact matches against past items in one vectorized map; remaining
+# descriptions are looked up once per distinct value in the item index.
+def categorize(df, item_map, item_index=None):
+    keys = df["ITEM"].map(normalize)
+    categories = keys.map(item_map)
+    if item_index is not None:
+        missing = keys[categories.isna() & ~df["Credit"]].unique()
+        guesses = {}
+        for key in missing:
+            match = item_index.complete(re.sub(r"[^a-z ]+", " ", key).strip(), limit=1)
+            if match and match[0]["category"]:
+                guesses[key] = match[0]["category"]
+        categories = categories.fillna(keys.map(guesses))
+    categories = categories.mask(df["Credit"], "income")
+    return df.assign(**{"ITEM CATEGORY": categories.fillna("")})
+
+
+# --- DE-DUPLICATION ---
+# Rows hash on (DATE, lower-cased ITEM, amount); an imported row is skipped
+# while the ledger already holds as many copies of its hash as the file has
+# seen so far, so repeated identical purchases still import correctly.
+def row_keys(dates, items, amounts):
+    return pd.util.hash_pandas_object(pd.DataFrame({
+        "DATE": pd.to_datetime(dates).dt.normalize().to_numpy(),
+        "ITEM": items.astype(str).map(normalize).to_numpy(),
+        "Amount": pd.to_numeric(amounts, errors="coerce").round(2).to_numpy(),
+    }), index=False)
+
+
+def key_counts(frame):
+    return row_keys(frame["DATE"], frame["ITEM"], frame["Amount Spent"]).value_counts()
+
+
+def drop_duplicates(df, existing_counts):
+    keys = row_keys(df["DATE"], df["ITEM"], df["Amount Spent"])
+    seen = keys.groupby(keys).cumcount()
+    return df[(seen >= keys.map(existing_counts).fillna(0)).to_numpy()].reset_index(drop=True)
+
+
+# --- SHEET ROWS ---
+# Spending and metadata rows in sheet column order; `numbers` are the
+# transaction No for each row
+def sheet_rows(df, numbers, payment_type="Bank Import"):
+    dates = df["DATE"]
+    date_text = dates.dt.month.astype(str) + "/" + dates.dt.day.astype(str) + "/" + dates.dt.year.astype(str)
+    times = dates.dt.strftime("%H:%M").where(dates.dt.normalize() != dates, "")
+    week_start = dates - pd.to_timedelta(dates.dt.weekday, unit="D")
+    weeks = week_start.dt.day.astype(str) + "-" + dates.dt.strftime("%b")
+    months = dates.dt.strftime("%B %Y")
+    spending_rows, meta_rows = [], []
+    for date, no, at, item, category, amount, week, month in zip(
+        date_text, numbers, times, df["ITEM"], df["ITEM CATEGORY"], df["Amount Spent"], weeks, months
+    ):
+        amount = int(amount) if float(amount).is_integer() else round(float(amount), 2)
+        spending_rows.append([date, int(no), at, item, category, 1, amount, week, month])
+        meta_rows.append([date, int(no), "", "", "", payment_type])
+    return spending_rows, meta_rows
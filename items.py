@@ -0,0 +1,123 @@
+import heapq
+import re
+from collections import Counter
+from statistics import median
+
+# Unit prices kept per item for the typical-price estimate
+PRICE_HISTORY = 30
+
+
+def normalize(name):
+    return re.sub(r"\s+", " ", str(name).strip().lower())
+
+
+def _trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class ItemStats:
+    def __init__(self, name):
+        self.name = name
+        self.grams = len(_trigrams(normalize(name)))
+        self.count = 0
+        # Last category the item was recorded under, as the old item map did
+        self.category = None
+        self.prices = []
+
+    @property
+    def unit_price(self):
+        return median(self.prices) if self.prices else None
+
+
+# --- ITEM INDEX ---
+# A trie over each word of the normalized item names answers prefix lookups
+# ("mtn d", "data") and a trigram index catches typos ("bred" -> "bread").
+# Keys are stored only where a name ends, so a lookup walks the subtree under
+# the prefix. Both are updated in place as transactions are added.
+class ItemIndex:
+    def __init__(self):
+        self.items = {}
+        self.trie = {}
+        self.trigrams = {}
+
+    def add(self, item, category, amount=None, qty=None):
+        key = normalize(item or "")
+        if not key:
+            return
+        stats = self.items.get(key)
+        if stats is None:
+            stats = self.items[key] = ItemStats(str(item).strip())
+            self._insert(key)
+        stats.count += 1
+        category = str(category or "").strip()
+        if category:
+            stats.category = category
+        try:
+            price = float(amount) / (float(qty) or 1.0)
+        except (TypeError, ValueError, ZeroDivisionError):
+            price = None
+        if price is not None and price > 0:
+            stats.prices = (stats.prices + [price])[-PRICE_HISTORY:]
+
+    def _insert(self, key):
+        words = key.split(" ")
+        for i in range(len(words)):
+            node = self.trie
+            for ch in " ".join(words[i:]):
+                node = node.setdefault(ch, {})
+            node.setdefault(None, set()).add(key)
+        for gram in _trigrams(key):
+            self.trigrams.setdefault(gram, set()).add(key)
+
+    def _prefix_matches(self, query):
+        node = self.trie
+        for ch in query:
+            node = node.get(ch)
+            if node is None:
+                return set()
+        keys, stack = set(), [node]
+        while stack:
+            node = stack.pop()
+            for ch, child in node.items():
+                if ch is None:
+                    keys |= child
+                else:
+                    stack.append(child)
+        return keys
+
+    def _fuzzy_matches(self, query, limit):
+        grams = _trigrams(query)
+        shared = Counter()
+        for gram in grams:
+            for key in self.trigrams.get(gram, ()):
+                shared[key] += 1
+        scored = []
+        for key, hits in shared.items():
+            # Jaccard similarity of the two trigram sets
+            score = hits / (len(grams) + self.items[key].grams - hits)
+            if score >= 0.3:
+                scored.append((score, self.items[key].count, key))
+        return [key for _, _, key in heapq.nlargest(limit, scored)]
+
+    def complete(self, query, limit=5):
+        query = normalize(query)
+        if not query:
+            return []
+        keys = heapq.nsmallest(limit, self._prefix_matches(query),
+                               key=lambda k: (k != query, -self.items[k].count, k))
+        if len(keys) < limit:
+            keys += [k for k in self._fuzzy_matches(query, limit) if k not in keys][:limit - len(keys)]
+        return [
+            {
+                "item": self.items[key].name,
+                "category": self.items[key].category,
+                "unit_price": self.items[key].unit_price,
+                "count": self.items[key].count,
+            }
+            for key in keys
+        ]
+
+    def predict_category(self, item):
+        stats = self.items.get(normalize(item or ""))
+        return stats.category if stats else None
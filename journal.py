@@ -0,0 +1,145 @@
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from mirror import CACHE_DIR
+from perf import sheet_call
+
+# --- WRITE JOURNAL ---
+# Submitted transactions are written to a local journal first and pushed to
+# both worksheets by a background thread with batched append_rows calls.
+# Entries stay in the journal until both sheets have accepted them, so a
+# failed flush (or a restart) just retries on the next run.
+class WriteJournal:
+    def __init__(self, spending_ws, meta_ws, path=None, retries=5, backoff=1.0):
+        self.spending_ws = spending_ws
+        self.meta_ws = meta_ws
+        self.path = path or os.path.join(CACHE_DIR, "journal.jsonl")
+        self.retries = retries
+        self.backoff = backoff
+        # Called with the spending entries about to be sent; returns the ones
+        # it renumbered to avoid a (DATE, No) already in the sheet
+        self.check_numbers = None
+        self.check_error = None
+        self.last_error = None
+        self._lock = threading.Lock()
+        # Held while a batch is being sent, so a reader can see the sheets
+        # and the journal from the same side of a flush
+        self.flush_lock = threading.Lock()
+        self._thread_lock = threading.Lock()
+        self._running = False
+        self._thread = None
+
+    def _read(self):
+        if not os.path.exists(self.path):
+            return []
+        with open(self.path) as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def _write(self, entries):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            for entry in entries:
+                f.write(json.dumps(entry) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    def pending(self):
+        with self._lock:
+            return self._read()
+
+    def enqueue(self, spending_row=None, meta_row=None):
+        return self.enqueue_many([(spending_row, meta_row)])[0]
+
+    # Many (spending_row, meta_row) pairs with one fsync and one flush, so a
+    # bulk import goes out as one append_rows call per sheet
+    def enqueue_many(self, pairs):
+        entries = [
+            {"id": uuid.uuid4().hex, "spending": spending_row, "meta": meta_row, "spending_done": False}
+            for spending_row, meta_row in pairs
+        ]
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "a") as f:
+                for entry in entries:
+                    f.write(json.dumps(entry) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+        self.flush_async()
+        return entries
+
+    def _flush_once(self):
+        with self._lock:
+            entries = self._read()
+        if not entries:
+            return []
+
+        # Spending rows first; mark them so a meta failure never re-sends them
+        todo = [e for e in entries if not e["spending_done"] and e["spending"] is not None]
+        if todo and self.check_numbers:
+            # A failed check must not hold back the writes themselves
+            try:
+                renumbered = {e["id"]: e for e in self.check_numbers(todo)}
+                self.check_error = None
+            except Exception as e:
+                logging.getLogger(__name__).warning("Transaction number check failed: %s", e)
+                self.check_error = e
+                renumbered = {}
+            if renumbered:
+                with self._lock:
+                    self._write([renumbered.get(e["id"], e) for e in self._read()])
+        if todo:
+            sheet_call("append_rows", self.spending_ws.append_rows, [e["spending"] for e in todo])
+            done_ids = {e["id"] for e in todo}
+            with self._lock:
+                current = self._read()
+                for e in current:
+                    if e["id"] in done_ids:
+                        e["spending_done"] = True
+                self._write(current)
+
+        meta_rows = [e["meta"] for e in entries if e["meta"] is not None]
+        if meta_rows:
+            sheet_call("append_rows", self.meta_ws.append_rows, meta_rows)
+        flushed_ids = {e["id"] for e in entries}
+        with self._lock:
+            self._write([e for e in self._read() if e["id"] not in flushed_ids])
+        return entries
+
+    def flush(self):
+        for attempt in range(self.retries):
+            try:
+                with self.flush_lock:
+                    flushed = self._flush_once()
+                self.last_error = None
+                return flushed
+            except Exception as e:
+                self.last_error = e
+                time.sleep(self.backoff * 2 ** attempt)
+        return []
+
+    # Runs until the journal is empty: after a round of retries fails it
+    # waits as long as the next backoff step and starts another, so queued
+    # rows don't sit until the next submission. The empty check and
+    # flush_async share a lock, so an entry queued as the thread stops
+    # starts a new one.
+    def _run(self):
+        while True:
+            with self._thread_lock:
+                if not self.pending():
+                    self._running = False
+                    return
+            if not self.flush():
+                time.sleep(self.backoff * 2 ** self.retries)
+
+    def flush_async(self):
+        with self._thread_lock:
+            if self._running:
+                return
+            self._running = True
+        self._thread = threading.Thread(target=self._run, name="sheet-journal-flush", daemon=True)
+        self._thread.start()
@@ -0,0 +1,356 @@
+import threading
+import time
+from collections import Counter
+from datetime import date, timedelta, time as time_of_day
+import pandas as pd
+from rollups import SpendRollup
+from perf import span
+from items import ItemIndex
+from recommend import RecommendationTables
+from sequence import SequenceAllocator
+from dateindex import DateIndex
+from spatial import PlaceIndex
+from storage import SPENDING_HEADERS, META_HEADERS, parse_sheet_date
+
+
+# --- TYPED FRAMES ---
+def transactions_frame(records):
+    df = pd.DataFrame(records, columns=SPENDING_HEADERS)
+    df["DATE"] = pd.to_datetime(df["DATE"], format="%m/%d/%Y", errors="coerce")
+    df["No"] = pd.to_numeric(df["No"], errors="coerce").astype("Int64")
+    df["TIME"] = pd.to_datetime(df["TIME"].astype(str), format="%H:%M", errors="coerce").dt.time
+    df["No of ITEM"] = pd.to_numeric(df["No of ITEM"], errors="coerce")
+    df["Amount Spent"] = pd.to_numeric(df["Amount Spent"], errors="coerce").astype(float)
+    for col in ["ITEM", "ITEM CATEGORY"]:
+        df[col] = df[col].astype(str).str.strip().astype("category")
+    return df
+
+
+def metadata_frame(records):
+    meta_df = pd.DataFrame(records, columns=META_HEADERS)
+    meta_df["DATE"] = pd.to_datetime(meta_df["DATE"], format="%m/%d/%Y", errors="coerce")
+    meta_df["No"] = pd.to_numeric(meta_df["No"], errors="coerce").astype("Int64")
+    meta_df["LAT"] = pd.to_numeric(meta_df["LAT"], errors="coerce")
+    meta_df["LON"] = pd.to_numeric(meta_df["LON"], errors="coerce")
+    return meta_df
+
+
+# Metadata columns attached to each transaction in the joined view
+JOIN_COLUMNS = ["LOCATION", "LAT", "LON", "PAYMENT_TYPE"]
+
+
+def _valid_key(key):
+    return not (pd.isna(key[0]) or pd.isna(key[1]))
+
+
+# (DATE, No) of each row, counted; a key's rows are interchangeable
+def _key_counts(frame):
+    return Counter(zip(frame["DATE"], frame["No"]))
+
+
+# Rows whose key is still owed in `counts` are dropped, one per count
+def _unclaimed(frame, counts):
+    keep = []
+    for pos, key in enumerate(zip(frame["DATE"], frame["No"])):
+        if counts[key] <= 0:
+            keep.append(pos)
+        counts[key] -= 1
+    return frame.iloc[keep]
+
+
+def _append_frame(frame, new_frame):
+    combined = pd.concat([frame, new_frame], ignore_index=True)
+    for col in combined.columns:
+        if isinstance(frame[col].dtype, pd.CategoricalDtype):
+            combined[col] = combined[col].astype("category")
+    return combined
+
+
+# Storage frame `new` starts with exactly the rows of `old`
+def _extends(new, old):
+    return len(new) >= len(old) and new.iloc[:len(old)].equals(old)
+
+
+# Spending rows and metadata rows of the journal's pending entries
+def _queued(pending):
+    return ([e["spending"] for e in pending if e["spending"] is not None],
+            [e["meta"] for e in pending if e["meta"] is not None])
+
+
+# Typed frames of rows in sheet column order
+def _rows_frames(spending_rows, meta_rows):
+    return (transactions_frame([dict(zip(SPENDING_HEADERS, row)) for row in spending_rows]),
+            metadata_frame([dict(zip(META_HEADERS, row)) for row in meta_rows]))
+
+
+# --- LEDGER ---
+# One in-process copy of both sheets plus everything derived from them.
+# New rows are applied as deltas; only a TTL expiry or an explicit refresh
+# goes back to storage, and a reload that only finds appended rows applies
+# those as deltas too. With background=True an expired ledger keeps serving
+# its current data while a single background thread reloads it.
+class Ledger:
+    # Everything a rebuild replaces; swapped in together once the load is done.
+    # raw/raw_meta are the storage frames the data was built from; extra and
+    # extra_meta count the (DATE, No) keys of rows added on top of them.
+    DATA = ("raw", "raw_meta", "extra", "extra_meta", "data_epoch", "frame", "meta_frame",
+            "rollup", "date_index", "recommender", "item_map", "item_index", "meta_index",
+            "spending_index", "joined", "place_index")
+
+    def __init__(self, storage, ttl=600, background=False):
+        self.storage = storage
+        self.ttl = ttl
+        self.background = background
+        self.loaded_at = None
+        self.refreshing = False
+        self.version = 0
+        # Bumped by invalidate(); a load started before that is not fresh
+        self.generation = 0
+        # Bumped by renumbered() and reset(); data built before that is
+        # rebuilt rather than caught up
+        self.epoch = 0
+        # Kept across reloads; each load only raises its counters
+        self.sequence = SequenceAllocator()
+        self._lock = threading.RLock()
+        self._reload_lock = threading.Lock()
+
+    def _build(self, spending, meta, pending, epoch):
+        self.raw, self.raw_meta = spending, meta
+        self.extra, self.extra_meta = Counter(), Counter()
+        self.data_epoch = epoch
+        self.frame = transactions_frame(spending)
+        self.meta_frame = metadata_frame(meta)
+        self.place_index = PlaceIndex.from_frame(self.meta_frame)
+        self.rollup = SpendRollup.from_frame(self.frame)
+        self.date_index = DateIndex.from_frame(self.frame)
+        self.recommender = RecommendationTables.from_frame(self.frame)
+        self.item_map = {}
+        self.item_index = ItemIndex()
+        self._index_items(self.frame)
+        self._build_join()
+        # Submissions still in the write journal are part of the dataset
+        self._apply(*_queued(pending))
+
+    # Brings the current data up to a newer snapshot with deltas: the rows
+    # appended to storage, less the ones this ledger already has because
+    # they were applied when submitted, plus entries queued elsewhere.
+    # Returns False, changing nothing, when the rows the data was built from
+    # no longer match or a queued entry was renumbered since.
+    def _catch_up(self, spending, meta, pending):
+        if not hasattr(self, "frame") or self.data_epoch != self.epoch:
+            return False
+        if not (_extends(spending, self.raw) and _extends(meta, self.raw_meta)):
+            return False
+        queued_frame, queued_meta_frame = _rows_frames(*_queued(pending))
+        deltas = []
+        for raw, new, extra, queued, build in (
+                (self.raw, spending, self.extra, queued_frame, transactions_frame),
+                (self.raw_meta, meta, self.extra_meta, queued_meta_frame, metadata_frame)):
+            tail = build(new.iloc[len(raw):])
+            queued_keys = _key_counts(queued)
+            # Rows applied here that have since been sent are in the tail
+            sent = extra - queued_keys
+            appended = _unclaimed(tail, sent)
+            if +sent:
+                return False
+            deltas.append((appended, _unclaimed(queued, Counter(extra)), queued_keys))
+        (appended, queued, queued_keys), (appended_meta, queued_meta, queued_meta_keys) = deltas
+        self._extend(pd.concat([appended, queued], ignore_index=True),
+                     pd.concat([appended_meta, queued_meta], ignore_index=True))
+        self.raw, self.raw_meta = spending, meta
+        self.extra, self.extra_meta = queued_keys, queued_meta_keys
+        return True
+
+    # A scratch ledger is built without holding the lock, so readers keep
+    # the current data meanwhile. A delta applied during the load is not in
+    # the scratch copy, so the load is redone rather than losing it; so is a
+    # load that an invalidate() (an explicit refresh) overtook.
+    def reload(self, only_if_stale=False):
+        with self._reload_lock, span("ledger.reload"):
+            # Callers that queued behind a load that just finished are done
+            if only_if_stale and not self.stale():
+                return
+            # Storage unchanged since the last load: keep the current data
+            generation = self.generation
+            if hasattr(self, "frame") and self.storage.is_unchanged():
+                with self._lock:
+                    if self.generation == generation:
+                        self.loaded_at = time.time()
+                        return
+            while True:
+                version, generation, epoch = self.version, self.generation, self.epoch
+                snapshot = self.storage.load_snapshot()
+                with self._lock:
+                    if self.version != version:
+                        continue
+                    caught_up = self._catch_up(*snapshot)
+                if not caught_up:
+                    fresh = Ledger(self.storage, self.ttl)
+                    fresh._build(*snapshot, epoch)
+                with self._lock:
+                    if not caught_up:
+                        if self.version != version:
+                            continue
+                        for name in self.DATA:
+                            setattr(self, name, getattr(fresh, name))
+                        self.sequence.seed(self.frame)
+                    self.version += 1
+                    if self.generation == generation:
+                        self.loaded_at = time.time()
+                        return
+
+    def stale(self):
+        return self.loaded_at is None or time.time() - self.loaded_at > self.ttl
+
+    def _refresh_in_background(self):
+        try:
+            self.reload(only_if_stale=True)
+        finally:
+            self.refreshing = False
+
+    def ensure_fresh(self):
+        if not self.stale():
+            return self
+        if self.loaded_at is None or not self.background:
+            # Nothing to serve yet (or no background mode): concurrent
+            # callers wait on the same load instead of starting their own
+            self.reload(only_if_stale=True)
+            return self
+        with self._lock:
+            if self.refreshing:
+                return self
+            self.refreshing = True
+        threading.Thread(target=self._refresh_in_background, daemon=True).start()
+        return self
+
+    def invalidate(self):
+        with self._lock:
+            self.generation += 1
+            self.loaded_at = None
+
+    # An explicit refresh: the next load re-reads every row from storage, so
+    # edits above the new rows show up too
+    def refresh(self):
+        self.storage.verify()
+        self.invalidate()
+
+    # Drops the local copies so the next load downloads everything. Holding
+    # the reload lock waits out an in-flight load still reading those files.
+    def reset(self):
+        with self._reload_lock:
+            self.storage.reset()
+            with self._lock:
+                self.epoch += 1
+            self.invalidate()
+
+    def _index_items(self, frame):
+        for item, category, amount, qty in zip(frame["ITEM"], frame["ITEM CATEGORY"],
+                                               frame["Amount Spent"], frame["No of ITEM"]):
+            if item and category:
+                self.item_map[item.lower()] = category
+            self.item_index.add(item, category, amount, qty)
+
+    def month_frame(self, year, month):
+        start = date(year, month, 1)
+        end = date(year + month // 12, month % 12 + 1, 1) - timedelta(days=1)
+        return self.date_index.select(self.frame, start, end).reset_index(drop=True)
+
+    # --- JOINED VIEW ---
+    # Transactions with their metadata attached, keyed on (DATE, No). The
+    # last metadata row wins when a key is duplicated.
+    def _build_join(self):
+        meta = self.meta_frame.dropna(subset=["DATE", "No"]).drop_duplicates(["DATE", "No"], keep="last")
+        self.meta_index = {
+            (date, no): values
+            for date, no, *values in meta[["DATE", "No"] + JOIN_COLUMNS].itertuples(index=False, name=None)
+        }
+        self.spending_index = {
+            key: pos for pos, key in enumerate(zip(self.frame["DATE"], self.frame["No"])) if _valid_key(key)
+        }
+        self.joined = self.frame.merge(meta[["DATE", "No"] + JOIN_COLUMNS], on=["DATE", "No"], how="left")
+
+    def _join_delta(self, new_frame, new_meta_frame):
+        updates = {}
+        for date, no, *values in new_meta_frame[["DATE", "No"] + JOIN_COLUMNS].itertuples(index=False, name=None):
+            if _valid_key((date, no)):
+                self.meta_index[(date, no)] = values
+                if (date, no) in self.spending_index:
+                    updates[self.spending_index[(date, no)]] = values
+
+        if updates:
+            # Metadata for rows already in the view; copy so readers keep a stable frame
+            joined = self.joined.copy()
+            for pos, values in updates.items():
+                joined.loc[pos, JOIN_COLUMNS] = values
+            self.joined = joined
+
+        if new_frame is not None:
+            start = len(self.joined)
+            matched = []
+            for offset, key in enumerate(zip(new_frame["DATE"], new_frame["No"])):
+                if _valid_key(key):
+                    self.spending_index[key] = start + offset
+                matched.append(self.meta_index.get(key, [None] * len(JOIN_COLUMNS)))
+            new_joined = new_frame.assign(**{
+                col: [values[i] for values in matched] for i, col in enumerate(JOIN_COLUMNS)
+            })
+            for col in ["LAT", "LON"]:
+                new_joined[col] = pd.to_numeric(new_joined[col], errors="coerce")
+            self.joined = _append_frame(self.joined, new_joined)
+
+    # The journal gave these queued entries new numbers at flush time; the
+    # rows applied earlier carry the old ones, so the next read rebuilds
+    def renumbered(self, entries):
+        for entry in entries:
+            day = parse_sheet_date(entry["spending"][0])
+            if day is not None:
+                self.sequence.observe(day, int(entry["spending"][1]))
+        with self._lock:
+            self.epoch += 1
+        self.invalidate()
+
+    def orphans(self):
+        spending_keys, meta_keys = set(self.spending_index), set(self.meta_index)
+        no_meta = [self.spending_index[key] for key in spending_keys - meta_keys]
+        no_spending = sorted(meta_keys - spending_keys)
+        return (
+            self.frame.iloc[sorted(no_meta)],
+            pd.DataFrame([[d, n] + list(self.meta_index[(d, n)]) for d, n in no_spending],
+                         columns=["DATE", "No"] + JOIN_COLUMNS),
+        )
+
+    # Applied whenever there is data, even while it's stale or being reloaded;
+    # the version bump makes an in-flight load start over so it can't drop
+    # the delta
+    def apply(self, spending_rows, meta_rows):
+        with self._lock:
+            if hasattr(self, "frame"):
+                self._apply(spending_rows, meta_rows)
+            self.version += 1
+
+    # Rows not in storage yet; their keys are kept so a later catch-up
+    # recognises them once they have been sent
+    def _apply(self, spending_rows, meta_rows):
+        new_frame, new_meta_frame = _rows_frames(spending_rows, meta_rows)
+        self.extra = self.extra + _key_counts(new_frame)
+        self.extra_meta = self.extra_meta + _key_counts(new_meta_frame)
+        self._extend(new_frame, new_meta_frame)
+
+    def _extend(self, new_frame, new_meta_frame):
+        self._join_delta(new_frame if len(new_frame) else None, new_meta_frame)
+        if len(new_frame):
+            self.date_index = self.date_index.extended(new_frame, len(self.frame))
+            self.frame = _append_frame(self.frame, new_frame)
+            self._index_items(new_frame)
+            for day, at, item in zip(new_frame["DATE"], new_frame["TIME"], new_frame["ITEM"]):
+                if not pd.isna(day):
+                    self.recommender.add(day.date(), at.hour if isinstance(at, time_of_day) else None, item)
+            for day, no, category, amount in zip(new_frame["DATE"], new_frame["No"],
+                                                 new_frame["ITEM CATEGORY"], new_frame["Amount Spent"]):
+                if not pd.isna(day):
+                    if not pd.isna(no):
+                        self.sequence.observe(day.date(), int(no))
+                    self.rollup.add(day.date(), category, amount)
+        if len(new_meta_frame):
+            self.meta_frame = _append_frame(self.meta_frame, new_meta_frame)
+            self.place_index.add_frame(new_meta_frame)
@@ -0,0 +1,213 @@
+import json
+import os
+import random
+import re
+import pandas as pd
+from gspread.exceptions import GSpreadException
+from gspread.utils import absolute_range_name, numericise_all, rowcol_to_a1
+from perf import sheet_call
+
+# --- LOCAL SHEET MIRROR ---
+# Keeps an on-disk Parquet copy of a worksheet so a cache miss (or a cold
+# restart) only has to fetch the rows appended since the last sync.
+CACHE_DIR = os.environ.get("SPENDING_CACHE_DIR", ".sheet_cache")
+# Earlier rows re-read with each tail fetch to catch edits above the tail
+SAMPLE_ROWS = 8
+
+
+class SheetMirror:
+    def __init__(self, worksheet, expected_headers, cache_dir=CACHE_DIR):
+        self.worksheet = worksheet
+        self.expected_headers = expected_headers
+        self.cache_dir = cache_dir
+        self.last_error = None
+        slug = re.sub(r"[^0-9a-z]+", "_", worksheet.title.lower()).strip("_")
+        self.path = os.path.join(cache_dir, f"{slug}.parquet")
+        self.state_path = os.path.join(cache_dir, f"{slug}.json")
+        self.last_sync = None
+
+    # Raw cell values are stored as strings, exactly as Sheets returns them,
+    # so a synced frame is identical to a freshly downloaded one.
+    def _read(self):
+        if not os.path.exists(self.path):
+            return None
+        try:
+            return pd.read_parquet(self.path)
+        except Exception:
+            return None
+
+    def _write(self, frame):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        frame.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, self.path)
+
+    # Drive modifiedTime of the spreadsheet as of the last sync
+    def synced_modified(self):
+        if not os.path.exists(self.state_path):
+            return None
+        with open(self.state_path) as f:
+            return json.load(f).get("modified")
+
+    def _save_modified(self, modified):
+        if modified is None:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = self.state_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"modified": modified}, f)
+        os.replace(tmp_path, self.state_path)
+
+    def _check_headers(self, headers):
+        missing = set(self.expected_headers) - set(headers)
+        if missing:
+            raise GSpreadException(
+                f"the given 'expected_headers' contains unknown headers: {missing}"
+            )
+
+    def _to_frame(self, headers, rows):
+        width = len(headers)
+        rows = [(list(row) + [""] * width)[:width] for row in rows]
+        return pd.DataFrame(rows, columns=headers, dtype=str)
+
+    def _last_col(self, frame):
+        return re.sub(r"\d", "", rowcol_to_a1(1, len(frame.columns)))
+
+    # Returns the local frame (None before the first sync) and the A1 range
+    # to fetch: the whole sheet, or the last synced row and everything after it
+    def _plan(self):
+        frame = self._read()
+        if frame is None:
+            return None, absolute_range_name(self.worksheet.title)
+        # Row 1 is the header, so the last synced row is len(frame) + 1
+        start = len(frame) + 1
+        return frame, absolute_range_name(self.worksheet.title, f"A{start}:{self._last_col(frame)}")
+
+    # Sheet rows above the tail to compare against the mirror, picked afresh
+    # for each modifiedTime so repeated syncs cover different rows
+    def _sample(self, frame, seed):
+        rows = range(2, len(frame) + 1)
+        picked = sorted(random.Random(seed).sample(rows, min(SAMPLE_ROWS, len(rows))))
+        last_col = self._last_col(frame)
+        return picked, [absolute_range_name(self.worksheet.title, f"A{row}:{last_col}{row}") for row in picked]
+
+    def _same_row(self, values, expected):
+        width = len(expected)
+        return ([str(v) for v in values] + [""] * width)[:width] == expected
+
+    # The first fetched row must still equal the last synced one (the header
+    # for an empty mirror), and each sampled row its mirrored copy; otherwise
+    # rows above the tail were edited or removed
+    def _overlap_ok(self, frame, values, sampled=(), samples=()):
+        if not values:
+            return False
+        expected = list(frame.columns) if frame.empty else list(frame.iloc[-1])
+        if not self._same_row(values[0], expected):
+            return False
+        return all(self._same_row(sample[0] if sample else [], list(frame.iloc[row - 2]))
+                   for row, sample in zip(sampled, samples))
+
+    def _apply(self, frame, values):
+        if frame is None:
+            headers = values[0] if values else list(self.expected_headers)
+            self._check_headers(headers)
+            frame = self._to_frame(headers, values[1:])
+            self._write(frame)
+        elif values:
+            frame = pd.concat([frame, self._to_frame(list(frame.columns), values)], ignore_index=True)
+            self._write(frame)
+        return frame
+
+    def sync(self):
+        return sync_mirrors(self.worksheet.spreadsheet, [self])[0]
+
+    @staticmethod
+    def to_records(frame):
+        headers = list(frame.columns)
+        return [dict(zip(headers, numericise_all(list(row))))
+                for row in frame.itertuples(index=False, name=None)]
+
+    def records(self):
+        return self.to_records(self.sync())
+
+    def reset(self):
+        for path in (self.path, self.state_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+# Drive modifiedTime of the spreadsheet, or None when it can't be read
+# (no Drive scope, offline); callers then fall back to fetching the tail
+def modified_time(spreadsheet):
+    try:
+        return sheet_call("get_lastUpdateTime", spreadsheet.get_lastUpdateTime)
+    except Exception:
+        return None
+
+
+# True when every mirror is on disk and was synced at this modifiedTime
+def mirrors_unchanged(mirrors, modified):
+    return modified is not None and all(
+        os.path.exists(mirror.path) and mirror.synced_modified() == modified for mirror in mirrors
+    )
+
+
+def _batch(spreadsheet, ranges):
+    response = sheet_call("values_batch_get", spreadsheet.values_batch_get, ranges)
+    return [value_range.get("values", []) for value_range in response.get("valueRanges", [])]
+
+
+# Syncs several mirrors of the same spreadsheet. A modifiedTime probe decides
+# between skipping the download and one values:batchGet of each sheet's new
+# rows plus a sample of earlier ones; only sheets whose earlier rows no
+# longer match are downloaded again. The sample only catches some edits, so
+# full=True (an explicit refresh) downloads every sheet in that one batch.
+def sync_mirrors(spreadsheet, mirrors, modified=None, full=False):
+    plans = [mirror._plan() for mirror in mirrors]
+    if modified is None:
+        modified = modified_time(spreadsheet)
+    if not full and mirrors_unchanged(mirrors, modified):
+        for mirror in mirrors:
+            mirror.last_sync = "skip"
+        return [frame for frame, _ in plans]
+
+    if full:
+        samples = [([], [])] * len(mirrors)
+        ranges = [absolute_range_name(mirror.worksheet.title) for mirror in mirrors]
+    else:
+        samples = [mirror._sample(frame, modified) if frame is not None else ([], [])
+                   for mirror, (frame, _) in zip(mirrors, plans)]
+        ranges = [a1_range for _, a1_range in plans] + [a1 for _, sample_ranges in samples for a1 in sample_ranges]
+    try:
+        values = _batch(spreadsheet, ranges)
+    except Exception as e:
+        if any(frame is None for frame, _ in plans):
+            raise
+        for mirror in mirrors:
+            mirror.last_error = e
+        return [frame for frame, _ in plans]
+
+    tails, sampled_values = values[:len(mirrors)], values[len(mirrors):]
+    frames, redo = [], []
+    for mirror, (frame, _), tail, (sampled, sample_ranges) in zip(mirrors, plans, tails, samples):
+        mirror.last_error = None
+        sample_values, sampled_values = sampled_values[:len(sample_ranges)], sampled_values[len(sample_ranges):]
+        if frame is None or full:
+            mirror.last_sync = "full"
+            frames.append(mirror._apply(None, tail))
+        elif mirror._overlap_ok(frame, tail, sampled, sample_values):
+            mirror.last_sync = "tail"
+            frames.append(mirror._apply(frame, tail[1:]))
+        else:
+            frames.append(None)
+            redo.append(mirror)
+
+    if redo:
+        values = _batch(spreadsheet, [absolute_range_name(mirror.worksheet.title) for mirror in redo])
+        for mirror, sheet_values in zip(redo, values):
+            mirror.last_sync = "full"
+            frames[mirrors.index(mirror)] = mirror._apply(None, sheet_values)
+
+    for mirror in mirrors:
+        mirror._save_modified(modified)
+    return frames
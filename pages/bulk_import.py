@@ -0,0 +1,107 @@
+import streamlit as st
+from perf import start_rerun, mark, finish_rerun
+st.set_page_config(page_title="Bulk Import", layout="wide")
+start_rerun("bulk_import")
+
+import hashlib
+import io
+import pandas as pd
+from shared import (
+    category_budgets, prepare_import, import_transactions,
+    get_pending_count, refresh_data, get_data_as_of
+)
+from importer import detect_columns, read_statement
+
+# --- Refresh Button ---
+mark("Refresh Button")
+if st.button("🔄 Refresh Data"):
+    refresh_data()
+st.caption(get_data_as_of())
+
+# --- Parse Cache ---
+# Keyed on a hash of the file's bytes, so editing the preview or ticking a
+# box doesn't parse the whole statement again
+@st.cache_data(max_entries=4)
+def parse_statement(digest, columns, dayfirst, _data):
+    return read_statement(io.BytesIO(_data), columns, dayfirst=dayfirst)
+
+st.title("📥 Bulk Import")
+st.caption("Import a CSV statement export. Rows already in the tracker (same date, item and amount) are skipped.")
+
+# --- Upload ---
+mark("Upload")
+uploaded = st.file_uploader("🏦 Statement (CSV)", type=["csv"])
+if uploaded is None:
+    finish_rerun()
+    st.stop()
+
+data = uploaded.getvalue()
+header = list(pd.read_csv(io.BytesIO(data), nrows=0).columns)
+detected = detect_columns(header)
+
+# --- Column Mapping ---
+mark("Column Mapping")
+st.markdown("### 🧭 Columns")
+options = ["—"] + header
+
+def pick(label, field, col):
+    value = col.selectbox(label, options, index=options.index(detected[field]) if detected[field] else 0)
+    return None if value == "—" else value
+
+col1, col2, col3, col4, col5 = st.columns(5)
+columns = {
+    "date": pick("📅 Date", "date", col1),
+    "description": pick("🛒 Description", "description", col2),
+    "amount": pick("💰 Amount (signed)", "amount", col3),
+    "debit": pick("➖ Debit", "debit", col4),
+    "credit": pick("➕ Credit", "credit", col5),
+}
+dayfirst = st.checkbox("Dates are day-first (DD/MM/YYYY)", value=True)
+
+if not columns["date"] or not columns["description"] or not (columns["amount"] or columns["debit"] or columns["credit"]):
+    st.warning("⚠ Pick the date, description and an amount (or debit/credit) column.")
+    finish_rerun()
+    st.stop()
+
+# --- Preview ---
+mark("Preview")
+parsed, refused = parse_statement(hashlib.sha256(data).hexdigest(), columns, dayfirst, data)
+new_rows, duplicates = prepare_import(parsed)
+
+if not refused.empty:
+    st.warning(f"⚠ {len(refused):,} row(s) left out: their amount is ambiguous, e.g. two sign markers "
+               "like \"-(500)\" or \"-500 CR\". Fix them in the file to import them.")
+    with st.expander("Rows left out"):
+        st.dataframe(refused, hide_index=True, use_container_width=True)
+
+col1, col2, col3 = st.columns(3)
+col1.metric("🧾 Rows Read", f"{len(parsed):,}")
+col2.metric("♻ Already Recorded", f"{duplicates:,}")
+col3.metric("🆕 To Import", f"{len(new_rows):,}")
+
+if new_rows.empty:
+    st.info("ℹ Nothing new to import.")
+    finish_rerun()
+    st.stop()
+
+uncategorized = (new_rows["ITEM CATEGORY"] == "").sum()
+if uncategorized:
+    st.caption(f"✏ {uncategorized} row(s) have no category yet; pick one below or they import uncategorized.")
+
+edited = st.data_editor(
+    new_rows.drop(columns=["Credit"]),
+    column_config={
+        "DATE": st.column_config.DatetimeColumn("DATE", format="MM/DD/YYYY HH:mm", disabled=True),
+        "ITEM CATEGORY": st.column_config.SelectboxColumn("ITEM CATEGORY", options=list(category_budgets.keys())),
+    },
+    hide_index=True,
+    use_container_width=True,
+    key="import_editor",
+)
+
+# --- Import ---
+mark("Import")
+if st.button(f"✅ Import {len(edited):,} Transactions"):
+    count = import_transactions(edited)
+    st.success(f"✅ Queued {count:,} transactions; {get_pending_count():,} waiting to sync.")
+finish_rerun()
@@ -0,0 +1,82 @@
+import streamlit as st
+st.set_page_config(page_title="Diagnostics", layout="wide")
+
+from perf import recent_reruns, totals, cache_stats, export_trace, reset
+from sheets import client_timings
+from shared import get_pending_count, refresh_data, storage
+from datetime import datetime
+import pandas as pd
+import altair as alt
+
+st.title("🩺 Diagnostics")
+
+col1, col2, col3 = st.columns(3)
+with col1:
+    if st.button("🧹 Clear Recorded Reruns"):
+        reset()
+with col2:
+    # A normal refresh fetches only what changed; this re-downloads both sheets
+    if st.button("♻ Force Full Reload"):
+        refresh_data(full=True)
+with col3:
+    st.download_button("⬇ Export Trace (Chrome/Perfetto JSON)", export_trace(),
+                       file_name="spending-tracker-trace.json", mime="application/json")
+
+# --- Totals ---
+col1, col2, col3, col4 = st.columns(4)
+col1.metric("📡 Sheets Calls", f"{totals['sheet_calls']:,}")
+col2.metric("📦 Cells Received", f"{totals['sheet_cells']:,}")
+col3.metric("⏱ Time in Sheets", f"{totals['sheet_seconds']:.2f}s")
+col4.metric("⏳ Pending Writes", f"{get_pending_count():,}")
+
+mirrors = [getattr(storage, name) for name in ("spending_mirror", "meta_mirror") if hasattr(storage, name)]
+if mirrors:
+    st.caption("Last sync: " + ", ".join(f"{m.worksheet.title} {m.last_sync or '—'}" for m in mirrors))
+journal = getattr(storage, "journal", None)
+if journal is not None and journal.check_error is not None:
+    st.caption(f"⚠ Last transaction number check failed: {journal.check_error}")
+
+if client_timings:
+    st.caption("Connection: " + ", ".join(f"{name} {seconds * 1000:.0f} ms" for name, seconds in client_timings.items()))
+
+# --- Recent Reruns ---
+st.markdown("### 🔁 Recent Reruns")
+reruns = recent_reruns()[::-1]
+if not reruns:
+    st.info("ℹ No reruns recorded yet. Open another page and come back.")
+    st.stop()
+
+summary = pd.DataFrame([{
+    "Started": datetime.fromtimestamp(r["started_at"]).strftime("%H:%M:%S"),
+    "Page": r["page"],
+    "Total (ms)": r["seconds"] * 1000,
+    "Sheets Calls": r["sheet_calls"],
+    "Cells Received": r["sheet_cells"],
+    "Cache Hits": sum(c["hits"] for c in r["cache"].values()),
+    "Cache Misses": sum(c["misses"] for c in r["cache"].values()),
+} for r in reruns])
+st.dataframe(summary.style.format({"Total (ms)": "{:.0f}"}), use_container_width=True)
+
+# --- Rerun Breakdown ---
+st.markdown("### 🧩 Rerun Breakdown")
+choice = st.selectbox("Rerun", range(len(reruns)),
+                      format_func=lambda i: f"{summary['Started'][i]} · {summary['Page'][i]} · {summary['Total (ms)'][i]:.0f} ms")
+events = pd.DataFrame(reruns[choice]["events"], columns=["cat", "name", "start", "seconds", "cells"])
+if not events.empty:
+    events["ms"] = events["seconds"] * 1000
+    chart = alt.Chart(events).mark_bar().encode(
+        x=alt.X("ms:Q", title="Wall time (ms)"),
+        y=alt.Y("name:N", sort=None, title=None),
+        color=alt.Color("cat:N", title="Kind"),
+        tooltip=["cat", "name", alt.Tooltip("ms:Q", format=".1f"), "cells"]
+    ).properties(height=max(150, 22 * len(events)))
+    st.altair_chart(chart, use_container_width=True)
+
+# --- Ledger Cache ---
+st.markdown("### 🗃 Ledger Cache (since start)")
+if cache_stats:
+    cache_df = pd.DataFrame.from_dict(cache_stats, orient="index").rename_axis("Loader").reset_index()
+    cache_df["Hit Rate"] = cache_df["hits"] / (cache_df["hits"] + cache_df["misses"])
+    st.dataframe(cache_df.style.format({"Hit Rate": "{:.0%}"}), use_container_width=True)
+else:
+    st.info("ℹ No loader calls recorded yet.")
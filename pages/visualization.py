@@ -1,151 +1,177 @@
 import streamlit as st
+from perf import start_rerun, mark, finish_rerun, timed_fragment
 st.set_page_config(page_title="Spending Analytics", layout="wide")
+start_rerun("visualization")
 
 from shared import (
-    load_all_data, refresh_data, category_budgets,
-    load_transaction_metadata, filter_data_by_period
+    refresh_data, category_budgets,
+    get_orphaned_rows, load_period, get_map_clusters, get_hotspots,
+    get_data_version, get_data_as_of
 )
+from datetime import datetime
+from spatial import ZOOM_LEVELS, cell_size
+from charts import box_stats
 import pandas as pd
 import pydeck as pdk
 import altair as alt
-import seaborn as sns
-import matplotlib.pyplot as plt
-from datetime import datetime, timedelta
 
 # ✅ Refresh Button
+mark("Refresh Button")
 if st.button("🔄 Refresh Data"):
     refresh_data()
+st.caption(get_data_as_of())
 
 # ✅ Load Data
-df = pd.DataFrame(load_all_data())
-df["DATE_dt"] = pd.to_datetime(df["DATE"], format="%m/%d/%Y", errors='coerce')
-df["Amount Spent"] = pd.to_numeric(df["Amount Spent"], errors="coerce")
-df = df[df["ITEM CATEGORY"].str.lower().isin([c.lower() for c in category_budgets if c.lower() not in ["savings", "income"]])]
+mark("Load Data")
+# Only budgeted spending categories are charted
+spending_categories = [c.lower() for c in category_budgets if c.lower() not in ["savings", "income"]]
+
+def budgeted(frame):
+    return frame[frame["ITEM CATEGORY"].str.lower().isin(spending_categories)]
 
 st.title("📊 Spending Visualizations")
 
-# --- Weekly Spending Bar Chart ---
-st.markdown("## 📅 Weekly Spending")
-today = datetime.now().date()
-week_start = today - timedelta(days=today.weekday())
-df_week = df[(df["DATE_dt"].dt.date >= week_start) & (df["DATE_dt"].dt.date <= today)]
-if not df_week.empty:
-    chart_data = df_week.groupby("DATE_dt")["Amount Spent"].sum().reset_index()
-    chart_data["Day"] = chart_data["DATE_dt"].dt.strftime("%a")
-    bar_chart = alt.Chart(chart_data).mark_bar().encode(
+# --- Chart Specs ---
+# Cached per data version and day, so the map widgets below don't rebuild them
+@st.cache_data(max_entries=8)
+def weekly_bar_spec(version, day, _df_week):
+    chart_data = _df_week.groupby("DATE")["Amount Spent"].sum().reset_index()
+    chart_data["Day"] = chart_data["DATE"].dt.strftime("%a")
+    return alt.Chart(chart_data).mark_bar().encode(
         x=alt.X("Day:N", sort=["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]),
         y="Amount Spent:Q",
         tooltip=["Day", "Amount Spent"]
-    ).properties(title="Daily Spending", height=250)
-    st.altair_chart(bar_chart, use_container_width=True)
+    ).properties(title="Daily Spending", height=250).to_dict()
+
+@st.cache_data(max_entries=8)
+def today_pie_spec(version, day, _pie_data):
+    return alt.Chart(_pie_data).mark_arc(innerRadius=50).encode(
+        theta="Amount Spent:Q", color="ITEM:N", tooltip=["ITEM", "Amount Spent"]
+    ).properties(height=350).to_dict()
+
+# Box statistics are computed here and drawn as layered Altair marks
+@st.cache_data(max_entries=8)
+def weekly_box_spec(version, day, _df_box):
+    stats, outliers = box_stats(_df_box)
+    x = alt.X("ITEM CATEGORY:N", title="Category", axis=alt.Axis(labelAngle=-45))
+    whiskers = alt.Chart(stats).mark_rule().encode(x=x, y=alt.Y("lower:Q", title="Amount Spent"), y2="upper:Q")
+    boxes = alt.Chart(stats).mark_bar(size=30).encode(
+        x=x, y="q1:Q", y2="q3:Q", color=alt.Color("ITEM CATEGORY:N", legend=None),
+        tooltip=["ITEM CATEGORY", "lower", "q1", "median", "q3", "upper"]
+    )
+    medians = alt.Chart(stats).mark_tick(color="white", size=30).encode(x=x, y="median:Q")
+    points = alt.Chart(outliers).mark_point().encode(x=x, y="Amount Spent:Q", tooltip=["ITEM CATEGORY", "Amount Spent"])
+    return (whiskers + boxes + medians + points).properties(
+        title="Weekly Spending Distribution by Category", height=350
+    ).to_dict()
+
+version, today = get_data_version(), datetime.now().date()
+
+# --- Weekly Spending Bar Chart ---
+mark("Weekly Spending Bar Chart")
+st.markdown("## 📅 Weekly Spending")
+df_week = budgeted(load_period("week"))
+if not df_week.empty:
+    st.vega_lite_chart(weekly_bar_spec(version, today, df_week), use_container_width=True)
 else:
     st.info("ℹ No data for this week yet.")
 st.markdown("---")
 
 # --- Today's Breakdown Pie Chart ---
+mark("Today's Breakdown Pie Chart")
 st.markdown("## 📌 Today's Spending Breakdown")
-today_str = f"{datetime.now().month}/{datetime.now().day}/{datetime.now().year}"
-df_today = df[df["DATE"] == today_str]
-pie_data = df_today.groupby("ITEM")["Amount Spent"].sum().reset_index()
+df_today = budgeted(load_period("today"))
+pie_data = df_today.groupby("ITEM", observed=True)["Amount Spent"].sum().reset_index()
 if not pie_data.empty:
-    pie_chart = alt.Chart(pie_data).mark_arc(innerRadius=50).encode(
-        theta="Amount Spent:Q", color="ITEM:N", tooltip=["ITEM", "Amount Spent"]
-    ).properties(height=350)
-    st.altair_chart(pie_chart, use_container_width=True)
+    st.vega_lite_chart(today_pie_spec(version, today, pie_data), use_container_width=True)
 else:
     st.info("ℹ No spending recorded today.")
 st.markdown("---")
 
 # --- Weekly Box Plot ---
+mark("Weekly Box Plot")
 st.markdown("## 📦 Weekly Spending Distribution (Box Plot)")
 df_box = df_week.dropna(subset=["ITEM CATEGORY", "Amount Spent"])
 if not df_box.empty:
-    fig, ax = plt.subplots(figsize=(10, 5))
-    sns.boxplot(data=df_box, x="ITEM CATEGORY", y="Amount Spent", ax=ax)
-    ax.set_title("Weekly Spending Distribution by Category")
-    ax.set_xlabel("Category")
-    ax.set_ylabel("Amount Spent")
-    plt.xticks(rotation=45)
-    st.pyplot(fig)
+    st.vega_lite_chart(weekly_box_spec(version, today, df_box), use_container_width=True)
 else:
     st.info("ℹ Not enough data for this week's box plot.")
 st.markdown("---")
 
 # --- MAP SECTION ---
-meta_df = pd.DataFrame(load_transaction_metadata())
-meta_df["LAT"] = pd.to_numeric(meta_df["LAT"], errors="coerce")
-meta_df["LON"] = pd.to_numeric(meta_df["LON"], errors="coerce")
-meta_df = meta_df.dropna(subset=["LAT", "LON"])
-
-# Merge with main data
-df_main = pd.DataFrame(load_all_data())
-df_main["No"] = df_main["No"].astype(str)
-meta_df["No"] = meta_df["No"].astype(str)
-map_df = pd.merge(meta_df, df_main, on=["DATE", "No"], how="left")
-
-# --- Add Filter Buttons ---
-st.markdown("## 🗺 Location-Based Spending Map")
-period = st.radio("Select period:", ["Today", "This Week", "This Month"], horizontal=True)
-period_key = {"Today": "today", "This Week": "week", "This Month": "month"}[period]
-filtered_map_df = filter_data_by_period(map_df, period=period_key)
-
-# --- Show Map ---
-if not filtered_map_df.empty:
-    st.markdown(f"### 📍 Spending Map ({period})")
-
-    layer = pdk.Layer(
-        "ScatterplotLayer",
-        data=filtered_map_df,
-        get_position='[LON, LAT]',
-        get_radius=100,
-        get_fill_color='[255, 140, 0, 160]',
-        pickable=True
-    )
-
-    tooltip = {
-        "html": """
-        <b>Location:</b> {LOCATION} <br/>
-        <b>Item:</b> {ITEM} <br/>
-        <b>Category:</b> {ITEM CATEGORY} <br/>
-        <b>Amount:</b> ₦{Amount Spent} <br/>
-        <b>Date:</b> {DATE}
-        """,
-        "style": {"backgroundColor": "steelblue", "color": "white"}
-    }
-
-    view_state = pdk.ViewState(
-        latitude=filtered_map_df["LAT"].mean(),
-        longitude=filtered_map_df["LON"].mean(),
-        zoom=11,
-        pitch=0
-    )
-
-    st.pydeck_chart(pdk.Deck(layers=[layer], initial_view_state=view_state, tooltip=tooltip))
-else:
-    st.info(f"ℹ No location-tagged transactions for {period.lower()}.")
-
-# --- Hotspot Table ---
-st.markdown(f"### 🔥 Top Spending Hotspots ({period})")
-
-# Exclude savings and income
-filtered_map_df = filtered_map_df[
-    ~filtered_map_df["ITEM CATEGORY"].str.lower().isin(["savings", "income"])
-]
-
-if not filtered_map_df.empty:
-    hotspots = filtered_map_df.groupby("LOCATION").agg({
-        "Amount Spent": "sum",
-        "DATE": "max",
-        "No": "count"
-    }).rename(columns={
-        "Amount Spent": "Total Spent",
-        "DATE": "Last Visit",
-        "No": "Visit Count"
-    }).sort_values("Visit Count", ascending=False).reset_index()
-
-    st.dataframe(hotspots.style.format({
-        "Total Spent": "₦{:.0f}",
-        "Last Visit": lambda d: pd.to_datetime(d).strftime("%b %d, %Y")
-    }))
-else:
-    st.info("ℹ No hotspot data for this period.")
\ No newline at end of file
+# Runs as a fragment: the period and zoom widgets only rerun the map and
+# hotspot table, not the charts above
+@st.fragment
+@timed_fragment("visualization: map")
+def map_section():
+    # --- Add Filter Buttons ---
+    mark("Map")
+    st.markdown("## 🗺 Location-Based Spending Map")
+    period = st.radio("Select period:", ["Today", "This Week", "This Month"], horizontal=True)
+    period_key = {"Today": "today", "This Week": "week", "This Month": "month"}[period]
+    zoom = st.select_slider("🔍 Map detail (zoom)", options=list(ZOOM_LEVELS), value=13)
+
+    # Spend is pre-aggregated into grid clusters, one map point per cluster
+    clusters = get_map_clusters(period_key)[zoom]
+
+    no_meta, no_spending = get_orphaned_rows()
+    if len(no_meta) or len(no_spending):
+        st.caption(f"ℹ {len(no_meta)} transaction(s) without location metadata, "
+                   f"{len(no_spending)} metadata row(s) without a transaction.")
+
+    # --- Show Map ---
+    mark("Show Map")
+    if not clusters.empty:
+        st.markdown(f"### 📍 Spending Map ({period})")
+
+        layer_df = clusters.assign(
+            RADIUS=(clusters["Visit Count"] ** 0.5) * cell_size(zoom) * 111_000 / 4,
+            LAST_VISIT=clusters["Last Visit"].dt.strftime("%m/%d/%Y"),
+        ).drop(columns=["Last Visit"])
+        layer = pdk.Layer(
+            "ScatterplotLayer",
+            data=layer_df,
+            get_position='[LON, LAT]',
+            get_radius="RADIUS",
+            get_fill_color='[255, 140, 0, 160]',
+            pickable=True
+        )
+
+        tooltip = {
+            "html": """
+            <b>Location:</b> {LOCATION} <br/>
+            <b>Transactions:</b> {Visit Count} <br/>
+            <b>Amount:</b> ₦{Total Spent} <br/>
+            <b>Last Visit:</b> {LAST_VISIT}
+            """,
+            "style": {"backgroundColor": "steelblue", "color": "white"}
+        }
+
+        view_state = pdk.ViewState(
+            latitude=clusters["LAT"].mean(),
+            longitude=clusters["LON"].mean(),
+            zoom=zoom,
+            pitch=0
+        )
+
+        st.pydeck_chart(pdk.Deck(layers=[layer], initial_view_state=view_state, tooltip=tooltip))
+    else:
+        st.info(f"ℹ No location-tagged transactions for {period.lower()}.")
+
+    # --- Hotspot Table ---
+    mark("Hotspot Table")
+    st.markdown(f"### 🔥 Top Spending Hotspots ({period})")
+
+    # Savings and income are excluded; nearby fixes are grouped into one place
+    hotspots = get_hotspots(period_key)
+
+    if not hotspots.empty:
+        st.dataframe(hotspots[["LOCATION", "Total Spent", "Last Visit", "Visit Count"]].style.format({
+            "Total Spent": "₦{:.0f}",
+            "Last Visit": lambda d: pd.to_datetime(d).strftime("%b %d, %Y")
+        }))
+    else:
+        st.info("ℹ No hotspot data for this period.")
+
+map_section()
+finish_rerun()
@@ -0,0 +1,160 @@
+import functools
+import json
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# Reruns kept for the diagnostics page
+MAX_RERUNS = 50
+
+# --- RERUN INSTRUMENTATION ---
+# Each page calls start_rerun() at the top, mark() at every section heading
+# and finish_rerun() at the end. Sheets calls, timed spans and ledger cache
+# lookups made on the same thread are attached to the current rerun; calls
+# from background threads (the write journal) only count towards the totals.
+_lock = threading.Lock()
+_local = threading.local()
+reruns = deque(maxlen=MAX_RERUNS)
+totals = {"sheet_calls": 0, "sheet_cells": 0, "sheet_seconds": 0.0}
+cache_stats = {}
+
+
+def _current():
+    return getattr(_local, "rerun", None)
+
+
+def _close_section(rerun, now):
+    if rerun["open"] is not None:
+        name, start = rerun["open"]
+        rerun["events"].append({"cat": "section", "name": name, "start": start - rerun["start"], "seconds": now - start})
+        rerun["open"] = None
+
+
+# A rerun cut short by st.rerun() is dropped when the next one starts
+def start_rerun(page):
+    _local.rerun = {
+        "page": page, "started_at": time.time(), "start": time.perf_counter(), "open": None,
+        "events": [], "sheet_calls": 0, "sheet_cells": 0, "cache": {},
+    }
+
+
+def mark(section):
+    rerun = _current()
+    if rerun is None:
+        return
+    now = time.perf_counter()
+    _close_section(rerun, now)
+    rerun["open"] = (section, now)
+
+
+def finish_rerun():
+    rerun = _current()
+    if rerun is None:
+        return
+    now = time.perf_counter()
+    _close_section(rerun, now)
+    rerun["seconds"] = now - rerun["start"]
+    _local.rerun = None
+    with _lock:
+        reruns.append(rerun)
+
+
+# For functions decorated with st.fragment. During a full rerun the
+# fragment's marks are sections of that rerun; when only the fragment
+# reruns, it is recorded as its own rerun named `name`.
+def timed_fragment(name):
+    def wrap(fn):
+        @functools.wraps(fn)
+        def run(*args, **kwargs):
+            if _current() is not None:
+                return fn(*args, **kwargs)
+            start_rerun(name)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                finish_rerun()
+        return run
+    return wrap
+
+
+def _record(cat, name, start, seconds, **extra):
+    rerun = _current()
+    if rerun is not None:
+        rerun["events"].append({"cat": cat, "name": name, "start": start - rerun["start"], "seconds": seconds, **extra})
+
+
+@contextmanager
+def span(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _record("span", name, start, time.perf_counter() - start)
+
+
+# Cells in a Sheets response (a values list, or a batchGet's valueRanges);
+# writes and metadata calls receive none
+def cells_received(value):
+    if isinstance(value, dict):
+        return sum(cells_received(value[key]) for key in ("values", "valueRanges") if key in value)
+    if isinstance(value, (list, tuple)):
+        return sum(cells_received(v) if isinstance(v, (list, tuple, dict)) else 1 for v in value)
+    return 0
+
+
+def sheet_call(name, fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    seconds = time.perf_counter() - start
+    cells = cells_received(result)
+    _record("sheets", name, start, seconds, cells=cells)
+    rerun = _current()
+    if rerun is not None:
+        rerun["sheet_calls"] += 1
+        rerun["sheet_cells"] += cells
+    with _lock:
+        totals["sheet_calls"] += 1
+        totals["sheet_cells"] += cells
+        totals["sheet_seconds"] += seconds
+    return result
+
+
+def cache_lookup(name, hit):
+    key = "hits" if hit else "misses"
+    rerun = _current()
+    if rerun is not None:
+        rerun["cache"].setdefault(name, {"hits": 0, "misses": 0})[key] += 1
+    with _lock:
+        cache_stats.setdefault(name, {"hits": 0, "misses": 0})[key] += 1
+
+
+def recent_reruns():
+    with _lock:
+        return list(reruns)
+
+
+def reset():
+    with _lock:
+        reruns.clear()
+        cache_stats.clear()
+        totals.update(sheet_calls=0, sheet_cells=0, sheet_seconds=0.0)
+
+
+# Chrome trace-event JSON (chrome://tracing, Perfetto) of the recent reruns
+def export_trace():
+    events = []
+    for rerun in recent_reruns():
+        base = rerun["started_at"] * 1e6
+        events.append({
+            "name": rerun["page"], "cat": "rerun", "ph": "X", "pid": 1, "tid": 1,
+            "ts": base, "dur": rerun["seconds"] * 1e6,
+            "args": {"sheet_calls": rerun["sheet_calls"], "sheet_cells": rerun["sheet_cells"], "cache": rerun["cache"]},
+        })
+        for event in rerun["events"]:
+            events.append({
+                "name": event["name"], "cat": event["cat"], "ph": "X", "pid": 1, "tid": 1,
+                "ts": base + event["start"] * 1e6, "dur": event["seconds"] * 1e6,
+                "args": {"cells": event["cells"]} if "cells" in event else {},
+            })
+    return json.dumps({"traceEvents": events, "displayTimeUnit": "ms"})
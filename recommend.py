@@ -0,0 +1,92 @@
+import heapq
+import math
+from datetime import date, time
+import numpy as np
+from items import normalize
+
+# (start hour, bucket) pairs; TIME is bucketed so "what do I buy around now"
+# has enough history per slot
+HOUR_BUCKETS = [(0, "night"), (6, "morning"), (12, "afternoon"), (17, "evening"), (21, "night")]
+
+# Cached ranking length per slot; requests for more fall back to a fresh ranking
+TOP_CACHE = 20
+
+_ORIGIN = date(2000, 1, 1)
+
+
+def hour_bucket(hour):
+    bucket = None
+    for start, name in HOUR_BUCKETS:
+        if hour >= start:
+            bucket = name
+    return bucket
+
+
+# --- RECOMMENDATION TABLES ---
+# Item weights per (weekday, hour bucket) and per weekday. Each purchase adds
+# exp(rate * days since origin), so older purchases count for less without
+# ever rescaling the stored weights (only the ranking matters).
+class RecommendationTables:
+    def __init__(self, half_life_days=90):
+        self.rate = math.log(2) / half_life_days
+        self.tables = {}
+        self.names = {}
+        self._top = {}
+
+    def _weight(self, day):
+        return math.exp(self.rate * (day - _ORIGIN).days)
+
+    @classmethod
+    def from_frame(cls, df, half_life_days=90):
+        tables = cls(half_life_days)
+        df = df.dropna(subset=["DATE"])
+        df = df[df["ITEM"].astype(str).str.strip() != ""]
+        if df.empty:
+            return tables
+        days = (df["DATE"] - np.datetime64(_ORIGIN)).dt.days
+        grouped = df.assign(
+            key=df["ITEM"].astype(str).map(normalize),
+            weekday=df["DATE"].dt.weekday,
+            bucket=df["TIME"].map(lambda t: hour_bucket(t.hour) if isinstance(t, time) else None),
+            weight=np.exp(tables.rate * days),
+        )
+        for name, key in zip(grouped["ITEM"].astype(str).str.strip(), grouped["key"]):
+            tables.names[key] = name
+        for (weekday, key), weight in grouped.groupby(["weekday", "key"])["weight"].sum().items():
+            tables._bump((weekday, None), key, weight)
+        timed = grouped.dropna(subset=["bucket"])
+        for (weekday, bucket, key), weight in timed.groupby(["weekday", "bucket", "key"])["weight"].sum().items():
+            tables._bump((weekday, bucket), key, weight)
+        return tables
+
+    def _bump(self, slot, key, weight):
+        table = self.tables.setdefault(slot, {})
+        table[key] = table.get(key, 0.0) + weight
+        self._top.pop(slot, None)
+
+    def add(self, day, hour, item):
+        key = normalize(item or "")
+        if not key:
+            return
+        self.names[key] = str(item).strip()
+        weight = self._weight(day)
+        self._bump((day.weekday(), None), key, weight)
+        if hour is not None:
+            self._bump((day.weekday(), hour_bucket(hour)), key, weight)
+
+    def _ranked(self, slot, top_n):
+        if slot not in self._top:
+            table = self.tables.get(slot, {})
+            self._top[slot] = heapq.nlargest(TOP_CACHE, table, key=table.get)
+        ranked = self._top[slot]
+        if top_n > TOP_CACHE:
+            table = self.tables.get(slot, {})
+            ranked = heapq.nlargest(top_n, table, key=table.get)
+        return ranked[:top_n]
+
+    # Items for the hour bucket first, topped up from the whole weekday
+    def recommend(self, weekday, hour=None, top_n=5):
+        keys = self._ranked((weekday, hour_bucket(hour)), top_n) if hour is not None else []
+        if len(keys) < top_n:
+            keys = keys + [k for k in self._ranked((weekday, None), top_n) if k not in keys]
+        return [self.names[key] for key in keys[:top_n]]
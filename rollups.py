@@ -0,0 +1,59 @@
+from datetime import timedelta
+
+# Categories that are money coming in/put away rather than spending
+NON_SPENDING = ("savings", "income")
+
+
+# --- SPEND ROLLUPS ---
+# Spend per (day, category), with week (Monday start) and month totals kept
+# alongside so appending a transaction only touches three buckets.
+class SpendRollup:
+    def __init__(self):
+        self.daily = {}
+        self.weekly = {}
+        self.monthly = {}
+        self.counts = {}
+
+    @classmethod
+    def from_frame(cls, df):
+        rollup = cls()
+        df = df.dropna(subset=["DATE"])
+        grouped = df.groupby([df["DATE"].dt.date, "ITEM CATEGORY"], observed=True)["Amount Spent"].agg(["sum", "size"])
+        for (day, category), amount, count in grouped.itertuples(name=None):
+            rollup.add(day, category, amount, count)
+        return rollup
+
+    def add(self, day, category, amount, count=1):
+        category = str(category).strip()
+        amount = float(amount) if amount == amount else 0.0
+        self.counts[day] = self.counts.get(day, 0) + int(count)
+        for buckets, key in ((self.daily, day),
+                             (self.weekly, day - timedelta(days=day.weekday())),
+                             (self.monthly, (day.year, day.month))):
+            bucket = buckets.setdefault(key, {})
+            bucket[category] = bucket.get(category, 0.0) + amount
+
+    def _total(self, bucket, exclude):
+        return sum(amount for category, amount in bucket.items() if category.lower() not in exclude)
+
+    def day_count(self, day):
+        return self.counts.get(day, 0)
+
+    # (year, month) pairs with at least one transaction, newest first
+    def months(self):
+        return sorted(self.monthly, reverse=True)
+
+    def categories(self):
+        return sorted({category for bucket in self.monthly.values() for category in bucket})
+
+    def day_total(self, day, exclude=NON_SPENDING):
+        return self._total(self.daily.get(day, {}), exclude)
+
+    def week_total(self, day, exclude=NON_SPENDING):
+        return self._total(self.weekly.get(day - timedelta(days=day.weekday()), {}), exclude)
+
+    def month_total(self, day, exclude=NON_SPENDING):
+        return self._total(self.monthly.get((day.year, day.month), {}), exclude)
+
+    def month_by_category(self, day):
+        return dict(self.monthly.get((day.year, day.month), {}))
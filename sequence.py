@@ -0,0 +1,59 @@
+import threading
+import pandas as pd
+
+# --- TRANSACTION NUMBERS ---
+# Per-date counters for the transaction No. Every session in the process
+# draws from the same counters under one lock, so two submissions for the
+# same day never get the same number. Seeding only ever raises a counter,
+# so numbers already handed out are not reused after a reload.
+class SequenceAllocator:
+    def __init__(self):
+        self.last = {}
+        self._lock = threading.Lock()
+
+    # Highest No per date in a transactions frame (parsed DATE and No)
+    def seed(self, frame):
+        rows = frame.dropna(subset=["DATE", "No"])
+        highest = rows.groupby(rows["DATE"].dt.date)["No"].max()
+        with self._lock:
+            for day, no in highest.items():
+                if int(no) > self.last.get(day, 0):
+                    self.last[day] = int(no)
+
+    def observe(self, day, no):
+        with self._lock:
+            if no > self.last.get(day, 0):
+                self.last[day] = no
+
+    # First of `count` consecutive numbers reserved for `day`
+    def allocate(self, day, count=1):
+        with self._lock:
+            first = self.last.get(day, 0) + 1
+            self.last[day] = first + count - 1
+            return first
+
+
+# Gives colliding entries the next free No for their date, changing the
+# spending and metadata rows together so the (DATE, No) join still holds.
+# `taken` maps each date to the numbers already used in the sheet. Entries
+# whose number is free keep it; only the collisions move. Returns the
+# entries that were renumbered.
+def renumber(entries, taken, parse_date):
+    colliding = []
+    for entry in entries:
+        day = parse_date(entry["spending"][0])
+        no = pd.to_numeric(entry["spending"][1], errors="coerce")
+        if day is None or pd.isna(no):
+            continue
+        used = taken.setdefault(day, set())
+        if int(no) in used:
+            colliding.append((entry, used))
+        else:
+            used.add(int(no))
+    for entry, used in colliding:
+        no = max(used) + 1
+        entry["spending"][1] = no
+        if entry["meta"] is not None:
+            entry["meta"][1] = no
+        used.add(no)
+    return [entry for entry, _ in colliding]
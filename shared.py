@@ -1,8 +1,14 @@
 import streamlit as st
-import gspread
-from oauth2client.service_account import ServiceAccountCredentials
 import pandas as pd
-from datetime import datetime, timedelta
+from datetime import datetime
+from ledger import Ledger
+from storage import SheetsBackend, SQLiteBackend
+from sheets import LazyWorksheet, open_spreadsheet
+from spatial import cluster_levels, find_hotspots
+from dateindex import period_range
+from perf import cache_lookup
+from budgets import BudgetBook, parse_versions, budget_report
+from importer import categorize, drop_duplicates, key_counts, sheet_rows
 
 # --- CATEGORY BUDGETS ---
 category_budgets = {
@@ -12,93 +18,220 @@ category_budgets = {
     "transport": 70000, "Savings": 400000,
 }
 
-# --- GOOGLE SHEETS AUTH ---
-creds_dict = dict(st.secrets["gcp_service_account"])
-scope = ['https://spreadsheets.google.com/feeds', 'https://www.googleapis.com/auth/drive']
-credentials = ServiceAccountCredentials.from_json_keyfile_dict(creds_dict, scope)
-gc = gspread.authorize(credentials)
+# --- BUDGET HISTORY ---
+# category_budgets applies from the start; later versions can be added to
+# secrets.toml as [budgets."YYYY-MM"] tables and apply from that month on
+budget_book = BudgetBook({(2000, 1): category_budgets, **parse_versions(st.secrets.get("budgets", {}))})
 
-sheet = gc.open_by_url("https://docs.google.com/spreadsheets/d/1Pugi_cuQw25_GsGpVQAyzjWuuOFRLmP8yGKaIb6unD0/edit")
-Spending_Sheet = sheet.worksheet("My Spending Sheet")
-Meta_Sheet = sheet.worksheet("TransactionMeta")  # ✅ NEW: Metadata Sheet
+def get_budgets(year, month):
+    return budget_book.for_month(year, month)
+
+# Utilization, remaining, burn rate and alert level per category for a month
+def get_budget_report(year, month, spent):
+    return budget_report(spent, get_budgets(year, month), year, month, datetime.now().date())
+
+# --- STORAGE BACKEND ("sheets" by default, or a local "sqlite" database) ---
+STORAGE_BACKEND = st.secrets.get("storage_backend", "sheets")
+
+if STORAGE_BACKEND == "sqlite":
+    storage = SQLiteBackend(st.secrets.get("sqlite_path"))
+else:
+    # --- GOOGLE SHEETS AUTH (deferred until the first sheet call) ---
+    @st.cache_resource
+    def get_spreadsheet():
+        return open_spreadsheet(dict(st.secrets["gcp_service_account"]))
+
+    Spending_Sheet = LazyWorksheet("My Spending Sheet", get_spreadsheet)
+    Meta_Sheet = LazyWorksheet("TransactionMeta", get_spreadsheet)  # ✅ NEW: Metadata Sheet
+
+    storage = SheetsBackend(Spending_Sheet, Meta_Sheet)
 
 # --- DATA LOADERS ---
-@st.cache_data(ttl=600)
-def load_all_data():
-    return Spending_Sheet.get_all_records(expected_headers=[
-        "DATE", "No", "TIME", "ITEM", "ITEM CATEGORY",
-        "No of ITEM", "Amount Spent", "WEEK", "MONTH"
-    ])
-
-@st.cache_data(ttl=3600)
+# A single process-wide ledger holds both sheets and the structures derived
+# from them; submissions are applied to it as deltas instead of clearing it.
+@st.cache_resource
+def get_ledger():
+    ledger = Ledger(storage, ttl=600,
+                    background=st.secrets.get("background_refresh", True))
+    storage.on_renumber = ledger.renumbered
+    return ledger
+
+# Loader reads count as cache hits when the ledger is already loaded and
+# within its TTL, and as misses when they trigger a reload
+def _fresh_ledger(name):
+    ledger = get_ledger()
+    cache_lookup(name, hit=not ledger.stale())
+    return ledger.ensure_fresh()
+
+def load_transactions():
+    # Parsed once per data load
+    return _fresh_ledger("load_transactions").frame.copy(deep=False)
+
+def load_rollups():
+    return _fresh_ledger("load_rollups").rollup
+
 def load_item_category_map():
-    all_data = load_all_data()
-    return {row["ITEM"].strip().lower(): row["ITEM CATEGORY"].strip()
-            for row in all_data if row["ITEM"] and row["ITEM CATEGORY"]}
+    return _fresh_ledger("load_item_category_map").item_map
+
+# Ranked item completions: {"item", "category", "unit_price", "count"}
+def complete_items(query, limit=5):
+    return _fresh_ledger("complete_items").item_index.complete(query, limit)
+
+def predict_category(item):
+    return _fresh_ledger("predict_category").item_index.predict_category(item)
+
+# --- MONTH-AT-A-TIME ACCESS (dashboard) ---
+# (year, month) pairs with data, newest first, straight from the rollups
+def get_available_months():
+    return load_rollups().months()
+
+def get_all_categories():
+    return load_rollups().categories()
+
+# One month's rows, selected through the ledger's date index
+def load_month_transactions(year, month):
+    return _fresh_ledger("load_month_transactions").month_frame(year, month)
 
 # --- REFRESH FUNCTION ---
-def refresh_data():
+# A refresh re-reads both sheets in one batch and compares them with the
+# local mirrors; full=True drops the mirrors first
+def refresh_data(full=False):
+    if full:
+        get_ledger().reset()
+    else:
+        get_ledger().refresh()
     st.cache_data.clear()
     st.rerun()
 
 # --- UTILITIES ---
-def get_today_count():
-    today_str = f"{datetime.now().month}/{datetime.now().day}/{datetime.now().year}"
-    return sum(1 for row in load_all_data() if row.get("DATE") == today_str)
+# Reserves `count` consecutive transaction numbers for `day` and returns the first
+def allocate_numbers(day, count=1):
+    return _fresh_ledger("allocate_numbers").sequence.allocate(day, count)
+
+# --- DATE-RANGE QUERIES ---
+# Binary search over the ledger's date index; start/end are inclusive dates
+# and either may be None for an open range
+def query_transactions(start=None, end=None, category=None, item=None, joined=False):
+    ledger = _fresh_ledger("query_transactions")
+    return ledger.date_index.select(ledger.joined if joined else ledger.frame, start, end, category, item)
+
+# Sum of Amount Spent; savings/income are excluded unless asked for by category
+def query_total(start=None, end=None, category=None, item=None):
+    return _fresh_ledger("query_total").date_index.total(start, end, category, item)
 
-def get_total_amount_by_period(key, value):
-    all_data = load_all_data()
-    return sum(float(row.get("Amount Spent", 0)) for row in all_data
-               if row.get(key) == value and row.get("ITEM CATEGORY", "").lower() not in ["savings", "income"])
+# "today", "week" (Monday to today) or "month"
+def load_period(period, joined=False):
+    return query_transactions(*period_range(period, datetime.now().date()), joined=joined)
 
 def get_today_total_amount():
-    return get_total_amount_by_period("DATE", f"{datetime.now().month}/{datetime.now().day}/{datetime.now().year}")
+    return query_total(*period_range("today", datetime.now().date()))
 
 def get_weekly_total_amount():
-    week_str = f"{(datetime.now() - timedelta(days=datetime.now().weekday())).day}-{datetime.now().strftime('%b')}"
-    return get_total_amount_by_period("WEEK", week_str)
+    return query_total(*period_range("week", datetime.now().date()))
 
 def get_monthly_total_amount():
-    return get_total_amount_by_period("MONTH", datetime.now().strftime("%B %Y"))
+    return query_total(*period_range("month", datetime.now().date()))
 
-def recommend_items_for_today(df, top_n=5):
-    if df.empty:
-        return []
-    df["DATE_dt"] = pd.to_datetime(df["DATE"], format="%m/%d/%Y", errors='coerce')
-    df["Weekday"] = df["DATE_dt"].dt.day_name()
-    today_weekday = datetime.now().strftime("%A")
-    df_today = df[df["Weekday"] == today_weekday]
-    return df_today["ITEM"].str.strip().value_counts().head(top_n).index.tolist()
+# Items usually bought on this weekday around this time (recent purchases weigh more)
+def recommend_items_for_today(top_n=5, now=None):
+    now = now or datetime.now()
+    return _fresh_ledger("recommend_items_for_today").recommender.recommend(now.weekday(), now.hour, top_n)
+
+# --- QUEUE A TRANSACTION (spending row + metadata row) ---
+def queue_transaction(spending_row, meta_row):
+    queue_transactions([spending_row], [meta_row])
+
+# Many rows go to the journal together and reach each sheet in one append_rows
+def queue_transactions(spending_rows, meta_rows):
+    storage.append(spending_rows, meta_rows)
+    get_ledger().apply(spending_rows, meta_rows)
+
+def get_pending_count():
+    return len(storage.pending())
+
+# --- BULK IMPORT ---
+@st.cache_data(max_entries=2)
+def _existing_keys(version):
+    return key_counts(load_transactions())
+
+# Categorizes parsed statement rows from item history and drops rows the
+# ledger already has; returns (new rows, number of duplicates skipped)
+def prepare_import(df):
+    ledger = _fresh_ledger("prepare_import")
+    df = categorize(df, ledger.item_map, ledger.item_index)
+    new = drop_duplicates(df, _existing_keys(ledger.version))
+    return new, len(df) - len(new)
+
+def import_transactions(df):
+    df = df.sort_values("DATE", kind="stable").reset_index(drop=True)
+    days = df["DATE"].dt.date
+    first = {day: allocate_numbers(day, count) for day, count in days.value_counts().items()}
+    numbers = days.map(first) + df.groupby(days).cumcount()
+    spending_rows, meta_rows = sheet_rows(df, numbers)
+    queue_transactions(spending_rows, meta_rows)
+    return len(spending_rows)
 
 # --- NEW: Save Metadata to TransactionMeta Sheet ---
 def save_transaction_metadata(DATE, No, LOCATION, LAT, LON, PAYMENT_TYPE):
     try:
-        Meta_Sheet.append_row([
-            DATE, No, LOCATION, LAT, LON, PAYMENT_TYPE
-        ])
+        storage.append([], [[DATE, No, LOCATION, LAT, LON, PAYMENT_TYPE]])
+        get_ledger().apply([], [[DATE, No, LOCATION, LAT, LON, PAYMENT_TYPE]])
     except Exception as e:
         st.error(f"❌ Failed to save metadata: {e}")
 
-@st.cache_data(ttl=600)
-def load_transaction_metadata():
-    return Meta_Sheet.get_all_records(expected_headers=[
-        "DATE", "No", "LOCATION", "LAT", "LON", "PAYMENT_TYPE"
-    ])
+# (LOCATION, metres away) of the closest place recorded near a GPS fix, or None
+def nearest_place(lat, lon):
+    # No GPS fix: nothing to look up, so don't load the ledger for it
+    if lat is None or lon is None or lat != lat or lon != lon:
+        return None
+    return _fresh_ledger("nearest_place").place_index.nearest(lat, lon)
+
+def load_metadata_frame():
+    return _fresh_ledger("load_metadata_frame").meta_frame.copy(deep=False)
+
+# Transactions with LOCATION, LAT, LON and PAYMENT_TYPE already attached
+def load_joined_transactions():
+    return _fresh_ledger("load_joined_transactions").joined.copy(deep=False)
+
+# (transactions without metadata, metadata rows without a transaction)
+def get_orphaned_rows():
+    return _fresh_ledger("get_orphaned_rows").orphans()
+
 # --- DATE FILTER HELPERS FOR DATAFRAMES ---
+# Expect the parsed DATE column from load_transactions()/load_metadata_frame().
+# For the ledger's own frames load_period() avoids the full scan.
 
 def filter_data_by_period(df, period="today"):
-    today = datetime.now().date()
-    if period == "today":
-        return df[pd.to_datetime(df["DATE"], format="%m/%d/%Y", errors="coerce").dt.date == today]
-    elif period == "week":
-        week_start = today - timedelta(days=today.weekday())
-        return df[
-            (pd.to_datetime(df["DATE"], format="%m/%d/%Y", errors="coerce").dt.date >= week_start) &
-            (pd.to_datetime(df["DATE"], format="%m/%d/%Y", errors="coerce").dt.date <= today)
-        ]
-    elif period == "month":
-        return df[
-            (pd.to_datetime(df["DATE"], format="%m/%d/%Y", errors="coerce").dt.month == today.month) &
-            (pd.to_datetime(df["DATE"], format="%m/%d/%Y", errors="coerce").dt.year == today.year)
-        ]
-    return df
\ No newline at end of file
+    start, end = period_range(period, datetime.now().date())
+    if start is None:
+        return df
+    return df[df["DATE"].between(pd.Timestamp(start), pd.Timestamp(end))]
+
+# --- SPATIAL AGGREGATES (cached per data version and day) ---
+# "🕒 Data as of 14:05:12", noting when a background refresh is running
+# Reads the ledger's state without loading it, so a caption at the top of a
+# page never waits on Sheets
+def get_data_as_of():
+    ledger = get_ledger()
+    if ledger.loaded_at is None:
+        return "🕒 Loading data…"
+    label = f"🕒 Data as of {datetime.fromtimestamp(ledger.loaded_at).strftime('%H:%M:%S')}"
+    return label + (" · refreshing…" if ledger.refreshing else "")
+
+def get_data_version():
+    return _fresh_ledger("get_data_version").version
+
+@st.cache_data(max_entries=32)
+def _map_clusters(version, period, day):
+    return cluster_levels(load_period(period, joined=True))
+
+@st.cache_data(max_entries=32)
+def _hotspots(version, period, day):
+    df = load_period(period, joined=True)
+    return find_hotspots(df[~df["ITEM CATEGORY"].str.lower().isin(["savings", "income"])])
+
+def get_map_clusters(period="today"):
+    return _map_clusters(get_data_version(), period, datetime.now().date())
+
+def get_hotspots(period="today"):
+    return _hotspots(get_data_version(), period, datetime.now().date())
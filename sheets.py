@@ -0,0 +1,48 @@
+import threading
+import time
+import gspread
+from oauth2client.service_account import ServiceAccountCredentials
+from perf import sheet_call
+
+SCOPE = ['https://spreadsheets.google.com/feeds', 'https://www.googleapis.com/auth/drive']
+SHEET_URL = "https://docs.google.com/spreadsheets/d/1Pugi_cuQw25_GsGpVQAyzjWuuOFRLmP8yGKaIb6unD0/edit"
+
+# Wall time of each connection step, so slow starts can be traced
+client_timings = {}
+
+
+def _timed(name, fn, *args):
+    start = time.perf_counter()
+    result = sheet_call(name, fn, *args)
+    client_timings[name] = time.perf_counter() - start
+    return result
+
+
+# --- GOOGLE SHEETS CLIENT ---
+# The gspread client keeps one authorized requests session, so the access
+# token and HTTP connections are reused for every call made through it.
+def open_spreadsheet(creds_dict, url=SHEET_URL):
+    credentials = ServiceAccountCredentials.from_json_keyfile_dict(creds_dict, SCOPE)
+    gc = _timed("authorize", gspread.authorize, credentials)
+    return _timed("open_spreadsheet", gc.open_by_url, url)
+
+
+# Stands in for a gspread Worksheet and only connects on first real use
+class LazyWorksheet:
+    def __init__(self, title, get_spreadsheet):
+        self.title = title
+        self._get_spreadsheet = get_spreadsheet
+        self._worksheet = None
+        self._lock = threading.Lock()
+
+    def resolve(self):
+        with self._lock:
+            if self._worksheet is None:
+                spreadsheet = self._get_spreadsheet()
+                self._worksheet = _timed(f"worksheet:{self.title}", spreadsheet.worksheet, self.title)
+        return self._worksheet
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self.resolve(), name)
@@ -0,0 +1,158 @@
+import math
+import numpy as np
+import pandas as pd
+
+# Map zoom levels clusters are pre-aggregated for
+ZOOM_LEVELS = (9, 11, 13, 15)
+
+# A past fix within this distance names the current position
+PLACE_RADIUS_M = 150
+
+# Metres per degree of latitude
+METERS_PER_DEGREE = 111_320
+
+
+# A grid cell covers roughly 16 screen pixels at the given map zoom
+def cell_size(zoom):
+    return 360 / (2 ** zoom) / 16
+
+
+# --- SPATIAL GRID ---
+# Points are bucketed into LAT/LON cells, so the map and hotspot payloads
+# grow with the number of occupied cells, not transactions. Longitude is
+# scaled by cos(lat) of the cell's row, so a cell is about as wide as it is
+# tall on the ground instead of narrowing away from the equator.
+def _cell_keys(points, size):
+    cell_lat = np.floor(points["LAT"] / size).astype("int64")
+    scale = np.cos(np.radians((cell_lat + 0.5) * size))
+    return cell_lat, np.floor(points["LON"] * scale / size).astype("int64")
+
+
+COLUMNS = ["LAT", "LON", "LOCATION", "Total Spent", "Visit Count", "Last Visit"]
+
+
+# One row per occupied cell, indexed by (cell_lat, cell_lon)
+def _clusters(df, size):
+    points = df.dropna(subset=["LAT", "LON"])
+    if points.empty:
+        return pd.DataFrame(columns=COLUMNS)
+
+    cell_lat, cell_lon = _cell_keys(points, size)
+    keyed = points.assign(cell_lat=cell_lat, cell_lon=cell_lon)
+    clusters = keyed.groupby(["cell_lat", "cell_lon"]).agg(**{
+        "LAT": ("LAT", "mean"),
+        "LON": ("LON", "mean"),
+        "Total Spent": ("Amount Spent", "sum"),
+        "Visit Count": ("LAT", "size"),
+        "Last Visit": ("DATE", "max"),
+    })
+
+    # Label each cell with its most frequent LOCATION
+    labels = (
+        keyed.dropna(subset=["LOCATION"])
+        .groupby(["cell_lat", "cell_lon", "LOCATION"]).size()
+        .sort_values(ascending=False).reset_index()
+        .drop_duplicates(["cell_lat", "cell_lon"])
+        .set_index(["cell_lat", "cell_lon"])["LOCATION"]
+    )
+    clusters["LOCATION"] = labels.reindex(clusters.index)
+    return clusters[COLUMNS]
+
+
+def cluster_points(df, zoom):
+    return _clusters(df, cell_size(zoom)).reset_index(drop=True)
+
+
+def cluster_levels(df, zooms=ZOOM_LEVELS):
+    return {zoom: cluster_points(df, zoom) for zoom in zooms}
+
+
+# Hotspots are ~150 m cells: nearby fixes count as one place even when
+# LOCATION was typed differently. A place split by a cell edge would rank as
+# two smaller spots, so starting from the busiest cell each one takes in its
+# unclaimed neighbours (the 8 cells around it) before ranking.
+def find_hotspots(df, zoom=14):
+    clusters = _clusters(df, cell_size(zoom)).sort_values("Visit Count", ascending=False, kind="stable")
+    occupied, owner = set(clusters.index), {}
+    for row, col in clusters.index:
+        if (row, col) in owner:
+            continue
+        for d_row in (-1, 0, 1):
+            for d_col in (-1, 0, 1):
+                cell = (row + d_row, col + d_col)
+                if cell in occupied and cell not in owner:
+                    owner[cell] = (row, col)
+    seeds = {}
+    visits = clusters["Visit Count"].astype(float)
+    merged = clusters.assign(
+        group=[seeds.setdefault(owner[cell], len(seeds)) for cell in clusters.index],
+        LAT=clusters["LAT"] * visits, LON=clusters["LON"] * visits,
+    ).groupby("group", sort=False).agg(**{
+        "LAT": ("LAT", "sum"),
+        "LON": ("LON", "sum"),
+        "LOCATION": ("LOCATION", "first"),
+        "Total Spent": ("Total Spent", "sum"),
+        "Visit Count": ("Visit Count", "sum"),
+        "Last Visit": ("Last Visit", "max"),
+    })
+    merged["LAT"] /= merged["Visit Count"]
+    merged["LON"] /= merged["Visit Count"]
+    return merged.sort_values("Visit Count", ascending=False, kind="stable").reset_index(drop=True)[COLUMNS]
+
+
+# --- NEAREST KNOWN PLACE ---
+# Labelled past fixes bucketed into cells one search radius wide, so a
+# lookup only measures the fixes in the cells around the point (more of
+# them east-west away from the equator, where a degree of longitude is
+# shorter). Repeat fixes of a place are stored once with a count. Cells are
+# replaced rather than changed, so lookups never see one mid-update.
+class PlaceIndex:
+    def __init__(self, radius_m=PLACE_RADIUS_M):
+        self.radius_m = radius_m
+        self.size = radius_m / METERS_PER_DEGREE
+        self.cells = {}
+
+    @classmethod
+    def from_frame(cls, meta_df, radius_m=PLACE_RADIUS_M):
+        index = cls(radius_m)
+        index.cells = index._group(meta_df)
+        return index
+
+    # {cell: {(lat, lon, location): count}} for the labelled fixes in a
+    # metadata frame; coordinates are rounded to about a metre
+    def _group(self, meta_df):
+        points = meta_df.dropna(subset=["LAT", "LON"])
+        labels = points["LOCATION"].fillna("").astype(str).str.strip()
+        points = points[labels != ""].assign(LOCATION=labels[labels != ""])
+        cells = {}
+        counts = points.groupby([points["LAT"].round(5), points["LON"].round(5), "LOCATION"]).size()
+        for (lat, lon, location), count in counts.items():
+            cells.setdefault(self._cell(lat, lon), {})[(lat, lon, location)] = int(count)
+        return cells
+
+    def _cell(self, lat, lon):
+        return math.floor(lat / self.size), math.floor(lon / self.size)
+
+    def add_frame(self, meta_df):
+        for key, fixes in self._group(meta_df).items():
+            cell = dict(self.cells.get(key, {}))
+            for fix, count in fixes.items():
+                cell[fix] = cell.get(fix, 0) + count
+            self.cells[key] = cell
+
+    # (LOCATION, metres away) of the closest labelled fix within the radius,
+    # or None; among fixes equally close the more visited label wins
+    def nearest(self, lat, lon):
+        if lat is None or lon is None or lat != lat or lon != lon:
+            return None
+        row, col = self._cell(lat, lon)
+        scale = math.cos(math.radians(lat))
+        reach = math.ceil(1 / max(scale, 0.01))
+        best = None
+        for d_row in (-1, 0, 1):
+            for d_col in range(-reach, reach + 1):
+                for (fix_lat, fix_lon, location), count in self.cells.get((row + d_row, col + d_col), {}).items():
+                    distance = math.hypot(fix_lat - lat, (fix_lon - lon) * scale) * METERS_PER_DEGREE
+                    if distance <= self.radius_m and (best is None or (distance, -count) < best[:2]):
+                        best = (distance, -count, location)
+        return None if best is None else (best[2], best[0])
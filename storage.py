@@ -0,0 +1,242 @@
+import os
+from abc import ABC, abstractmethod
+import sqlite3
+import threading
+from datetime import datetime
+from itertools import zip_longest
+import pandas as pd
+from mirror import CACHE_DIR, SheetMirror, sync_mirrors, modified_time, mirrors_unchanged
+from journal import WriteJournal
+from sequence import renumber
+
+SPENDING_HEADERS = [
+    "DATE", "No", "TIME", "ITEM", "ITEM CATEGORY",
+    "No of ITEM", "Amount Spent", "WEEK", "MONTH"
+]
+META_HEADERS = ["DATE", "No", "LOCATION", "LAT", "LON", "PAYMENT_TYPE"]
+
+
+def parse_sheet_date(value):
+    try:
+        return datetime.strptime(str(value), "%m/%d/%Y").date()
+    except ValueError:
+        return None
+
+
+def format_sheet_date(day):
+    return f"{day.month}/{day.day}/{day.year}"
+
+
+# --- STORAGE BACKENDS ---
+# Every backend returns rows shaped like Worksheet.get_all_records() and
+# accepts rows in sheet column order, so callers never see the difference.
+class StorageBackend(ABC):
+    on_renumber = None
+
+    @abstractmethod
+    def load(self):
+        pass
+
+    @abstractmethod
+    def load_metadata(self):
+        pass
+
+    # Spending records and metadata records together
+    def load_all(self):
+        return self.load(), self.load_metadata()
+
+    @abstractmethod
+    def append(self, spending_rows, meta_rows):
+        pass
+
+    def pending(self):
+        return []
+
+    # Both sheets as DataFrames of raw values in sheet column order
+    def load_frames(self):
+        records, meta = self.load_all()
+        return pd.DataFrame(records, columns=SPENDING_HEADERS), pd.DataFrame(meta, columns=META_HEADERS)
+
+    # load_frames() plus the pending entries, with nothing flushed in between
+    # (an entry sent after the load but before pending() would be in neither)
+    def load_snapshot(self):
+        spending, meta = self.load_frames()
+        return spending, meta, self.pending()
+
+    # Cheap check that nothing changed since the last load; True lets a
+    # reload keep the data it already has
+    def is_unchanged(self):
+        return False
+
+    # Makes the next load compare every row instead of just the new ones
+    def verify(self):
+        pass
+
+    def reset(self):
+        pass
+
+
+class SheetsBackend(StorageBackend):
+    def __init__(self, spending_ws, meta_ws, cache_dir=CACHE_DIR):
+        self.spending_mirror = SheetMirror(spending_ws, SPENDING_HEADERS, cache_dir)
+        self.meta_mirror = SheetMirror(meta_ws, META_HEADERS, cache_dir)
+        self.journal = WriteJournal(spending_ws, meta_ws, os.path.join(cache_dir, "journal.jsonl"))
+        self.journal.check_numbers = self._check_numbers
+        self._probed = None
+        self._verify = False
+        # Loads and the journal's number check both sync the mirrors
+        self._sync_lock = threading.Lock()
+        self.journal.flush_async()  # retry anything left over from a previous run
+
+    def load(self):
+        return self.spending_mirror.records()
+
+    def load_metadata(self):
+        return self.meta_mirror.records()
+
+    # One Drive metadata call; the modifiedTime seen is reused by load_all.
+    # Queued entries may since have been renumbered, which modifiedTime
+    # can't show, so any pending entry means a real load. The probe runs
+    # under the flush lock so it never lands mid-flush, after a renumber
+    # but before the append that changes modifiedTime.
+    def is_unchanged(self):
+        with self.journal.flush_lock:
+            if self._verify or self.journal.pending():
+                return False
+            self._probed = modified_time(self.spending_mirror.worksheet.spreadsheet)
+            if not mirrors_unchanged([self.spending_mirror, self.meta_mirror], self._probed):
+                return False
+        self.spending_mirror.last_sync = self.meta_mirror.last_sync = "skip"
+        return True
+
+    def _sync(self, modified=None, full=False):
+        with self._sync_lock:
+            spreadsheet = self.spending_mirror.worksheet.spreadsheet
+            return sync_mirrors(spreadsheet, [self.spending_mirror, self.meta_mirror], modified, full)
+
+    def verify(self):
+        self._verify = True
+
+    # The mirrors' own frames: cell strings straight from Parquet
+    def load_frames(self):
+        modified, self._probed = self._probed, None
+        full, self._verify = self._verify, False
+        spending, meta = self._sync(modified, full)
+        # Offline: the next load tries the full download again
+        if full and self.spending_mirror.last_error:
+            self._verify = True
+        return spending, meta
+
+    def load_all(self):
+        spending, meta = self.load_frames()
+        return SheetMirror.to_records(spending), SheetMirror.to_records(meta)
+
+    def append(self, spending_rows, meta_rows):
+        self.journal.enqueue_many(zip_longest(spending_rows, meta_rows))
+
+    # Numbers come from one process's allocator, so another process (or a
+    # stale seed) can still have used the same (DATE, No). Syncing the
+    # mirrors first (a modifiedTime probe, then at most one batched tail
+    # fetch) brings in rows appended elsewhere; the synced spending sheet
+    # then shows which numbers are taken.
+    def _check_numbers(self, entries):
+        days = {parse_sheet_date(e["spending"][0]) for e in entries}
+        spending, _ = self._sync()
+        taken = {}
+        for value, no in spending[["DATE", "No"]].itertuples(index=False, name=None):
+            day = parse_sheet_date(value)
+            if day in days and str(no).strip().isdigit():
+                taken.setdefault(day, set()).add(int(no))
+        changed = renumber(entries, taken, parse_sheet_date)
+        if changed and self.on_renumber:
+            self.on_renumber(changed)
+        return changed
+
+    def pending(self):
+        return self.journal.pending()
+
+    def load_snapshot(self):
+        with self.journal.flush_lock:
+            return super().load_snapshot()
+
+    # Drops the mirrors so the next load downloads both sheets in full
+    def reset(self):
+        with self._sync_lock:
+            self.spending_mirror.reset()
+            self.meta_mirror.reset()
+
+
+class SQLiteBackend(StorageBackend):
+    def __init__(self, path=None):
+        self.path = path or os.path.join(CACHE_DIR, "spending.db")
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS spending (
+                    "DATE" TEXT, "No" INTEGER, "TIME" TEXT, "ITEM" TEXT, "ITEM CATEGORY" TEXT,
+                    "No of ITEM" NUMERIC, "Amount Spent" NUMERIC, "WEEK" TEXT, "MONTH" TEXT
+                );
+                CREATE INDEX IF NOT EXISTS idx_spending_date ON spending ("DATE");
+                CREATE INDEX IF NOT EXISTS idx_spending_date_no ON spending ("DATE", "No");
+                CREATE TABLE IF NOT EXISTS meta (
+                    "DATE" TEXT, "No" INTEGER, "LOCATION" TEXT, "LAT" REAL, "LON" REAL, "PAYMENT_TYPE" TEXT
+                );
+                CREATE INDEX IF NOT EXISTS idx_meta_date_no ON meta ("DATE", "No");
+            """)
+
+    # DATE is stored as ISO text so ranges sort and compare correctly
+    @staticmethod
+    def _to_iso(value):
+        day = parse_sheet_date(value)
+        return day.isoformat() if day else str(value)
+
+    @staticmethod
+    def _from_iso(value):
+        try:
+            return format_sheet_date(datetime.strptime(value, "%Y-%m-%d"))
+        except (TypeError, ValueError):
+            return value
+
+    def _select(self, table, headers, where="", params=()):
+        columns = ", ".join(f'"{h}"' for h in headers)
+        with self._lock:
+            cursor = self._conn.execute(f"SELECT {columns} FROM {table} {where} ORDER BY rowid", params)
+            rows = cursor.fetchall()
+        return [
+            {h: ("" if v is None else v) for h, v in zip(headers, (self._from_iso(row[0]),) + row[1:])}
+            for row in rows
+        ]
+
+    def _insert(self, table, headers, rows):
+        columns = ", ".join(f'"{h}"' for h in headers)
+        marks = ", ".join("?" for _ in headers)
+        rows = [[self._to_iso(row[0])] + list(row[1:len(headers)]) for row in rows]
+        with self._lock, self._conn:
+            self._conn.executemany(f"INSERT INTO {table} ({columns}) VALUES ({marks})", rows)
+
+    def load(self):
+        return self._select("spending", SPENDING_HEADERS)
+
+    def load_metadata(self):
+        return self._select("meta", META_HEADERS)
+
+    def append(self, spending_rows, meta_rows):
+        self._insert("spending", SPENDING_HEADERS, spending_rows)
+        self._insert("meta", META_HEADERS, meta_rows)
+
+
+# --- SYNC JOB ---
+# Both ledgers are append-only, so mirroring is copying the source rows past
+# the target's row count.
+def sync_backends(source, target):
+    spending = [[row.get(h, "") for h in SPENDING_HEADERS] for row in source.load()]
+    meta = [[row.get(h, "") for h in META_HEADERS] for row in source.load_metadata()]
+    pending = target.pending()
+    done_spending = len(target.load()) + sum(1 for e in pending if e["spending"] is not None)
+    done_meta = len(target.load_metadata()) + sum(1 for e in pending if e["meta"] is not None)
+    new_spending, new_meta = spending[done_spending:], meta[done_meta:]
+    if new_spending or new_meta:
+        target.append(new_spending, new_meta)
+    return len(new_spending), len(new_meta)
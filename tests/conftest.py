@@ -0,0 +1,18 @@
+import os
+import shutil
+import sys
+import tempfile
+import pytest
+
+# Modules live at the repository root and read SPENDING_CACHE_DIR on import
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+CACHE_DIR = tempfile.mkdtemp(prefix="spending-tests-")
+os.environ["SPENDING_CACHE_DIR"] = CACHE_DIR
+
+
+@pytest.fixture(autouse=True)
+def clean_cache():
+    shutil.rmtree(CACHE_DIR, ignore_errors=True)
+    os.makedirs(CACHE_DIR)
+    yield CACHE_DIR
@@ -0,0 +1,84 @@
+import re
+
+SPENDING = ["DATE", "No", "TIME", "ITEM", "ITEM CATEGORY", "No of ITEM", "Amount Spent", "WEEK", "MONTH"]
+META = ["DATE", "No", "LOCATION", "LAT", "LON", "PAYMENT_TYPE"]
+
+
+def spending_row(day, no, item="rice", category="Food", amount=500):
+    return [day, str(no), "10:00", item, category, "1", str(amount), "1-Jan", "January 2025"]
+
+
+def meta_row(day, no, location="Shop"):
+    return [day, str(no), location, "6.5", "3.3", "Cash"]
+
+
+def _column(letters):
+    number = 0
+    for letter in letters:
+        number = number * 26 + ord(letter) - 64
+    return number
+
+
+# In-memory stand-ins for gspread's Worksheet and Spreadsheet: enough of
+# get/append_rows/values_batch_get/get_lastUpdateTime for the mirrors and
+# the write journal, with every call recorded.
+class FakeWorksheet:
+    def __init__(self, spreadsheet, title, values):
+        self.spreadsheet = spreadsheet
+        self.title = title
+        self.values = [list(row) for row in values]
+
+    def _range(self, a1):
+        match = re.fullmatch(r"([A-Z]+)(\d*)(?::([A-Z]+)(\d*))?", a1)
+        first_col, first_row, last_col, last_row = match.groups()
+        start = int(first_row or 1)
+        end = int(last_row) if last_row else len(self.values)
+        cols = slice(_column(first_col) - 1, _column(last_col or first_col))
+        return [list(row[cols]) for row in self.values[start - 1:end]]
+
+    def get(self, a1):
+        self.spreadsheet.calls.append(("get", self.title, a1))
+        return self._range(a1)
+
+    def get_all_values(self):
+        self.spreadsheet.calls.append(("get_all_values", self.title))
+        return [list(row) for row in self.values]
+
+    def append_rows(self, rows, **kwargs):
+        if self.spreadsheet.fail_appends:
+            self.spreadsheet.fail_appends -= 1
+            raise ConnectionError("append failed")
+        self.spreadsheet.calls.append(("append_rows", self.title, len(rows)))
+        self.values.extend([str(value) for value in row] for row in rows)
+        self.spreadsheet.revision += 1
+
+
+class FakeSpreadsheet:
+    def __init__(self, spending=(), meta=()):
+        self.calls = []
+        self.revision = 0
+        self.fail_appends = 0
+        self.sheets = {
+            "My Spending Sheet": FakeWorksheet(self, "My Spending Sheet", [SPENDING] + list(spending)),
+            "TransactionMeta": FakeWorksheet(self, "TransactionMeta", [META] + list(meta)),
+        }
+
+    def worksheet(self, title):
+        return self.sheets[title]
+
+    # Another device editing the sheet
+    def edit(self, title, row, col, value):
+        self.sheets[title].values[row - 1][col - 1] = value
+        self.revision += 1
+
+    def get_lastUpdateTime(self):
+        return f"rev-{self.revision}"
+
+    def values_batch_get(self, ranges, params=None):
+        self.calls.append(("values_batch_get", tuple(ranges)))
+        value_ranges = []
+        for name in ranges:
+            title, _, a1 = name.partition("!")
+            sheet = self.sheets[title.strip("'")]
+            value_ranges.append({"range": name, "values": sheet._range(a1) if a1 else [list(r) for r in sheet.values]})
+        return {"valueRanges": value_ranges}
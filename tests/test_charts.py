@@ -0,0 +1,32 @@
+import numpy as np
+import pandas as pd
+from charts import lttb, downsample, binned_series
+
+
+def test_lttb_keeps_short_series_whole():
+    assert list(lttb(np.arange(5), np.arange(5), 10)) == [0, 1, 2, 3, 4]
+    assert list(lttb(np.arange(5), np.arange(5), 2)) == [0, 1, 2, 3, 4]
+
+
+def test_lttb_keeps_ends_and_peaks():
+    x = np.arange(1000)
+    y = np.zeros(1000)
+    y[317], y[712] = 50, -40
+    keep = lttb(x, y, 20)
+    assert len(keep) == 20
+    assert keep[0] == 0 and keep[-1] == 999
+    assert 317 in keep and 712 in keep
+    assert list(keep) == sorted(set(keep))
+
+
+def test_downsample_caps_each_series():
+    dates = pd.date_range("2024-01-01", periods=600)
+    df = pd.DataFrame({"DATE": list(dates) * 2, "Amount": np.arange(1200.0), "Metric": ["a"] * 600 + ["b"] * 600})
+    out = downsample(df, "DATE", "Amount", by="Metric", max_points=50)
+    assert out.groupby("Metric").size().to_dict() == {"a": 50, "b": 50}
+
+
+def test_binned_series_downsamples_only_when_asked():
+    df = pd.DataFrame({"DATE": pd.date_range("2025-01-01", periods=31), "Amount Spent": 1.0})
+    assert len(binned_series(df)) == 31
+    assert len(binned_series(df, max_points=10)) == 10
@@ -0,0 +1,48 @@
+from datetime import date
+import pandas as pd
+from dateindex import DateIndex, period_range
+
+
+def frame(rows):
+    df = pd.DataFrame(rows, columns=["DATE", "ITEM", "ITEM CATEGORY", "Amount Spent"])
+    return df.assign(DATE=pd.to_datetime(df["DATE"]))
+
+
+ROWS = [
+    ["2025-01-03", "Rice", "Food", 500],
+    ["2025-01-01", "Bread", "Food", 200],
+    [None, "Lost", "Food", 999],
+    ["2025-01-02", "Salary", "Income", 10000],
+    ["2025-01-03", "MTN Data", "Data", 1000],
+]
+
+
+def test_period_range_weeks_cross_months():
+    assert period_range("today", date(2025, 1, 1)) == (date(2025, 1, 1), date(2025, 1, 1))
+    assert period_range("week", date(2025, 1, 1)) == (date(2024, 12, 30), date(2025, 1, 1))
+    assert period_range("month", date(2024, 2, 10)) == (date(2024, 2, 1), date(2024, 2, 29))
+    assert period_range("year") == (None, None)
+
+
+def test_select_returns_rows_in_frame_order():
+    df = frame(ROWS)
+    index = DateIndex.from_frame(df)
+    assert index.select(df, date(2025, 1, 2), date(2025, 1, 3))["ITEM"].tolist() == ["Rice", "Salary", "MTN Data"]
+    assert index.positions().tolist() == [0, 1, 3, 4]
+
+
+def test_totals_leave_out_income_unless_filtered():
+    index = DateIndex.from_frame(frame(ROWS))
+    assert index.total() == 1700
+    assert index.total(category=" income ") == 10000
+    assert index.total(date(2025, 1, 3), date(2025, 1, 3), item="rice") == 500
+    assert index.count(date(2025, 1, 4)) == 0
+
+
+def test_extended_matches_a_rebuild():
+    df = frame(ROWS)
+    extra = frame([["2025-01-04", "Bread", "Food", 300], ["2025-01-01", "Rice", "Food", 450]])
+    index = DateIndex.from_frame(df).extended(extra, len(df))
+    rebuilt = DateIndex.from_frame(pd.concat([df, extra], ignore_index=True))
+    assert index.positions(category="Food").tolist() == rebuilt.positions(category="Food").tolist()
+    assert index.total(date(2025, 1, 1), date(2025, 1, 1)) == rebuilt.total(date(2025, 1, 1), date(2025, 1, 1)) == 650
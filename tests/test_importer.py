@@ -0,0 +1,48 @@
+import io
+import pandas as pd
+from importer import _money, read_statement, drop_duplicates, key_counts
+
+
+def test_money_reads_bank_sign_conventions():
+    amounts, rejected = _money(pd.Series(["(500)", "1,200.50", "500 CR", "500 DR", "500-", "₦ 2,000", "", None]))
+    assert amounts.tolist()[:6] == [-500, 1200.5, 500, -500, -500, 2000]
+    assert amounts[6:].isna().all()
+    assert not rejected.any()
+
+
+def test_money_refuses_ambiguous_values():
+    amounts, rejected = _money(pd.Series(["-(500)", "(500", "-500 CR", "1.2.3", "n/a"]))
+    assert rejected.all()
+    assert amounts.isna().all()
+
+
+def test_read_statement_sets_direction_and_reports_refused_rows():
+    csv = io.StringIO(
+        "Date,Narration,Debit,Credit\n"
+        "01/06/2025,bread,(700),\n"
+        "02/06/2025,salary,,50000 CR\n"
+        "03/06/2025,odd,-(500),\n"
+    )
+    columns = {"date": "Date", "description": "Narration", "amount": None, "debit": "Debit", "credit": "Credit"}
+    parsed, refused = read_statement(csv, columns, chunk_rows=2)
+    assert parsed[["ITEM", "Amount Spent", "Credit"]].values.tolist() == [["bread", 700, False], ["salary", 50000, True]]
+    assert refused["Narration"].tolist() == ["odd"]
+
+
+def test_signed_amount_column_uses_parentheses_for_spending():
+    csv = io.StringIO("Date,Details,Amount\n01/06/2025,bread,(700)\n02/06/2025,refund,300\n")
+    columns = {"date": "Date", "description": "Details", "amount": "Amount"}
+    parsed, _ = read_statement(csv, columns)
+    assert parsed["Credit"].tolist() == [False, True]
+
+
+def frame(rows):
+    df = pd.DataFrame(rows, columns=["DATE", "ITEM", "Amount Spent"])
+    return df.assign(DATE=pd.to_datetime(df["DATE"], format="ISO8601"))
+
+
+def test_drop_duplicates_keeps_repeats_beyond_what_is_recorded():
+    existing = frame([["2025-06-01", "Bread", 700]])
+    imported = frame([["2025-06-01 09:30", "bread ", 700], ["2025-06-01", "bread", 700], ["2025-06-02", "bread", 700]])
+    kept = drop_duplicates(imported, key_counts(existing))
+    assert kept["DATE"].dt.day.tolist() == [1, 2]
@@ -0,0 +1,42 @@
+from items import ItemIndex
+
+
+def make_index():
+    index = ItemIndex()
+    for item, category, amount, qty in [
+        ("Rice", "Food", 1000, 2), ("rice", "Food", 1200, 2), ("Bread", "Food", 800, 1),
+        ("MTN Data", "Data", 1000, 1), ("Airtel data", "Data", 500, 1), ("Rice", "Groceries", 1100, 2),
+    ]:
+        index.add(item, category, amount, qty)
+    return index
+
+
+def test_prefix_matches_any_word():
+    index = make_index()
+    assert [s["item"] for s in index.complete("mtn d")] == ["MTN Data"]
+    assert {s["item"] for s in index.complete("data")} == {"MTN Data", "Airtel data"}
+
+
+def test_typos_fall_back_to_trigrams():
+    assert make_index().complete("bred")[0]["item"] == "Bread"
+
+
+def test_most_used_item_comes_first_with_median_price():
+    top = make_index().complete("r")[0]
+    assert (top["item"], top["count"], top["unit_price"]) == ("Rice", 3, 550)
+
+
+def test_predict_category_is_the_last_one_recorded():
+    index = make_index()
+    assert index.predict_category(" RICE ") == "Groceries"
+    assert index.predict_category("unknown") is None
+
+
+def test_trie_keeps_keys_only_where_names_end():
+    index = ItemIndex()
+    index.add("mtn data", "Data")
+    node = index.trie
+    for ch in "mtn dat":
+        node = node[ch]
+        assert None not in node
+    assert node["a"][None] == {"mtn data"}
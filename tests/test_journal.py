@@ -0,0 +1,113 @@
+from fakes import FakeSpreadsheet, spending_row, meta_row
+from journal import WriteJournal
+from storage import SheetsBackend
+
+
+def make_journal(tmp_path, book):
+    journal = WriteJournal(book.worksheet("My Spending Sheet"), book.worksheet("TransactionMeta"),
+                           path=str(tmp_path / "journal.jsonl"), retries=3, backoff=0)
+    journal.flush_async = lambda: None
+    return journal
+
+
+def test_flush_sends_each_sheet_one_batch(tmp_path):
+    book = FakeSpreadsheet()
+    journal = make_journal(tmp_path, book)
+    journal.enqueue_many([(spending_row("1/6/2025", n), meta_row("1/6/2025", n)) for n in (1, 2, 3)])
+    assert len(journal.flush()) == 3
+    assert [c for c in book.calls if c[0] == "append_rows"] == [
+        ("append_rows", "My Spending Sheet", 3), ("append_rows", "TransactionMeta", 3)]
+    assert journal.pending() == []
+
+
+def test_failed_meta_append_does_not_resend_spending(tmp_path):
+    book = FakeSpreadsheet()
+    journal = make_journal(tmp_path, book)
+    journal.enqueue(spending_row("1/6/2025", 1), meta_row("1/6/2025", 1))
+    meta_ws = book.worksheet("TransactionMeta")
+    append = meta_ws.append_rows
+    attempts = []
+
+    def flaky(rows, **kwargs):
+        attempts.append(len(rows))
+        if len(attempts) == 1:
+            raise ConnectionError("meta down")
+        return append(rows, **kwargs)
+
+    meta_ws.append_rows = flaky
+    journal.flush()
+    assert len(book.worksheet("My Spending Sheet").values) == 2
+    assert len(meta_ws.values) == 2
+    assert journal.pending() == []
+
+
+def test_entries_stay_queued_after_retries_run_out(tmp_path):
+    book = FakeSpreadsheet()
+    book.fail_appends = 10
+    journal = make_journal(tmp_path, book)
+    journal.enqueue(spending_row("1/6/2025", 1), meta_row("1/6/2025", 1))
+    assert journal.flush() == []
+    assert isinstance(journal.last_error, ConnectionError)
+    assert len(journal.pending()) == 1
+
+
+def test_background_flush_keeps_retrying_while_entries_are_queued(tmp_path):
+    book = FakeSpreadsheet()
+    # More failures than one round of retries
+    book.fail_appends = 7
+    journal = WriteJournal(book.worksheet("My Spending Sheet"), book.worksheet("TransactionMeta"),
+                           path=str(tmp_path / "journal.jsonl"), retries=3, backoff=0)
+    journal.enqueue(spending_row("1/6/2025", 1), meta_row("1/6/2025", 1))
+    journal._thread.join(5)
+    assert journal.pending() == []
+    assert len(book.worksheet("TransactionMeta").values) == 2
+
+
+def test_renumbered_entries_are_written_back_before_sending(tmp_path):
+    book = FakeSpreadsheet()
+    journal = make_journal(tmp_path, book)
+    journal.enqueue(spending_row("1/6/2025", 1), meta_row("1/6/2025", 1))
+
+    def check(entries):
+        entries[0]["spending"][1] = entries[0]["meta"][1] = 7
+        return entries
+
+    journal.check_numbers = check
+    journal.flush()
+    assert book.worksheet("My Spending Sheet").values[-1][1] == "7"
+    assert book.worksheet("TransactionMeta").values[-1][1] == "7"
+
+
+def test_failed_number_check_still_flushes(tmp_path):
+    book = FakeSpreadsheet()
+    journal = make_journal(tmp_path, book)
+    journal.enqueue(spending_row("1/6/2025", 1), meta_row("1/6/2025", 1))
+
+    def check(entries):
+        raise ConnectionError("probe failed")
+
+    journal.check_numbers = check
+    assert len(journal.flush()) == 1
+    assert isinstance(journal.check_error, ConnectionError)
+    assert journal.pending() == []
+
+
+def test_backend_renumbers_against_rows_appended_elsewhere():
+    book = FakeSpreadsheet([spending_row("1/6/2025", 1)], [meta_row("1/6/2025", 1)])
+    backend = SheetsBackend(book.worksheet("My Spending Sheet"), book.worksheet("TransactionMeta"))
+    backend.journal._thread.join()
+    backend.load_all()
+    # Another device takes No 2 after this process synced
+    book.worksheet("My Spending Sheet").append_rows([spending_row("1/6/2025", 2, item="bread")])
+    book.worksheet("TransactionMeta").append_rows([meta_row("1/6/2025", 2)])
+    renumbered = []
+    backend.on_renumber = renumbered.extend
+    book.calls.clear()
+    backend.append([spending_row("1/6/2025", 2)], [meta_row("1/6/2025", 2)])
+    backend.journal._thread.join()
+
+    assert [row[1] for row in book.worksheet("My Spending Sheet").values[1:]] == ["1", "2", "3"]
+    assert book.worksheet("TransactionMeta").values[-1][1] == "3"
+    assert len(renumbered) == 1
+    # The check reuses the batched mirror sync; no separate worksheet reads
+    assert not [c for c in book.calls if c[0] == "get"]
@@ -0,0 +1,234 @@
+import threading
+from fakes import FakeSpreadsheet, spending_row, meta_row, SPENDING, META
+from ledger import Ledger
+from storage import SheetsBackend, StorageBackend
+
+
+# Rows held in memory; load_all can be paused to hold a load mid-flight
+class MemoryBackend(StorageBackend):
+    def __init__(self, spending):
+        self.spending = [dict(zip(SPENDING, row)) for row in spending]
+        self.meta = []
+        self.gate = None
+        self.waiting = threading.Event()
+        self.resets = 0
+
+    def load(self):
+        return list(self.spending)
+
+    def load_metadata(self):
+        return list(self.meta)
+
+    def load_all(self):
+        records = self.load()
+        if self.gate is not None:
+            self.waiting.set()
+            self.gate.wait(5)
+        return records, self.load_metadata()
+
+    def append(self, spending_rows, meta_rows):
+        self.spending += [dict(zip(SPENDING, row)) for row in spending_rows]
+        self.meta += [dict(zip(META, row)) for row in meta_rows]
+
+    def reset(self):
+        self.resets += 1
+
+
+def start(target):
+    thread = threading.Thread(target=target)
+    thread.start()
+    return thread
+
+
+def wait_until(condition):
+    for _ in range(500):
+        if condition():
+            return
+        threading.Event().wait(0.01)
+    raise AssertionError("timed out")
+
+
+def test_refresh_during_background_load_is_not_dropped():
+    storage = MemoryBackend([spending_row("1/6/2025", 1)])
+    ledger = Ledger(storage, background=True)
+    ledger.reload()
+    assert len(ledger.frame) == 1
+
+    # A TTL refresh starts and reads the old rows, then stalls
+    storage.gate = threading.Event()
+    ledger.invalidate()
+    background = start(ledger.reload)
+    wait_until(storage.waiting.is_set)
+
+    # The user adds a row elsewhere and presses Refresh
+    storage.spending.append(dict(zip(SPENDING, spending_row("1/6/2025", 2))))
+    ledger.invalidate()
+    refresh = start(lambda: ledger.reload(only_if_stale=True))
+    storage.gate.set()
+    background.join()
+    refresh.join()
+
+    assert len(ledger.frame) == 2
+    assert not ledger.stale()
+
+
+def test_reset_waits_for_in_flight_load():
+    storage = MemoryBackend([spending_row("1/6/2025", 1)])
+    ledger = Ledger(storage)
+    storage.gate = threading.Event()
+    loading = start(ledger.reload)
+    wait_until(lambda: ledger._reload_lock.locked())
+    resetting = start(ledger.reset)
+    threading.Event().wait(0.05)
+    assert storage.resets == 0
+    storage.gate.set()
+    loading.join()
+    resetting.join()
+    assert storage.resets == 1
+    assert ledger.stale()
+
+
+def test_pending_rows_and_applied_deltas_are_in_the_ledger():
+    storage = MemoryBackend([spending_row("1/6/2025", 1)])
+    ledger = Ledger(storage)
+    ledger.reload()
+    ledger.apply([spending_row("1/6/2025", 2)], [meta_row("1/6/2025", 2)])
+    assert ledger.rollup.day_count(ledger.frame["DATE"][0].date()) == 2
+    assert ledger.joined["LOCATION"].iloc[-1] == "Shop"
+
+
+def test_flush_between_load_and_pending_read_is_not_lost():
+    book = FakeSpreadsheet([spending_row("1/6/2025", 1)], [meta_row("1/6/2025", 1)])
+    storage = SheetsBackend(book.worksheet("My Spending Sheet"), book.worksheet("TransactionMeta"))
+    storage.journal._thread.join()
+    storage.journal.flush_async = lambda: None
+    storage.append([spending_row("1/6/2025", 2)], [meta_row("1/6/2025", 2)])
+    load_all = storage.load_all
+
+    # The journal flushes right after the sheets were read
+    def load_then_flush():
+        loaded = load_all()
+        flush = start(storage.journal.flush)
+        flush.join(0.5)
+        return loaded
+
+    storage.load_all = load_then_flush
+    ledger = Ledger(storage)
+    ledger.reload()
+    assert sorted(ledger.frame["No"]) == [1, 2]
+
+
+def test_submission_after_refresh_is_kept():
+    book = FakeSpreadsheet([spending_row("1/6/2025", 1)], [meta_row("1/6/2025", 1)])
+    storage = SheetsBackend(book.worksheet("My Spending Sheet"), book.worksheet("TransactionMeta"))
+    storage.journal._thread.join()
+    storage.journal.flush_async = lambda: None
+    ledger = Ledger(storage)
+    ledger.reload()
+    ledger.invalidate()
+    storage.append([spending_row("1/6/2025", 2)], [meta_row("1/6/2025", 2)])
+    ledger.apply([spending_row("1/6/2025", 2)], [meta_row("1/6/2025", 2)])
+    # modifiedTime hasn't moved, but a queued entry rules out the shortcut
+    assert not storage.is_unchanged()
+    ledger.ensure_fresh()
+    assert sorted(ledger.frame["No"]) == [1, 2]
+    assert len(storage.pending()) == 1
+
+
+def test_submission_during_a_load_makes_it_start_over():
+    storage = MemoryBackend([spending_row("1/6/2025", 1)])
+    ledger = Ledger(storage)
+    ledger.reload()
+    ledger.invalidate()
+    storage.gate = threading.Event()
+    loading = start(ledger.reload)
+    wait_until(storage.waiting.is_set)
+    storage.append([spending_row("1/6/2025", 2)], [meta_row("1/6/2025", 2)])
+    ledger.apply([spending_row("1/6/2025", 2)], [meta_row("1/6/2025", 2)])
+    storage.gate.set()
+    loading.join()
+    assert sorted(ledger.frame["No"]) == [1, 2]
+    assert not ledger.stale()
+
+
+def test_reader_during_a_renumbering_flush_gets_the_new_numbers():
+    book = FakeSpreadsheet([spending_row("1/6/2025", 1)], [meta_row("1/6/2025", 1)])
+    storage = SheetsBackend(book.worksheet("My Spending Sheet"), book.worksheet("TransactionMeta"))
+    storage.journal._thread.join()
+    storage.journal.flush_async = lambda: None
+    ledger = Ledger(storage)
+    ledger.reload()
+    storage.append([spending_row("1/6/2025", 2)], [meta_row("1/6/2025", 2)])
+    ledger.apply([spending_row("1/6/2025", 2)], [meta_row("1/6/2025", 2)])
+    # Another device takes No 2 first, so the flush renumbers ours to 3
+    book.worksheet("My Spending Sheet").append_rows([spending_row("1/6/2025", 2, item="bread")])
+    book.worksheet("TransactionMeta").append_rows([meta_row("1/6/2025", 2)])
+    readers = []
+
+    # A page reads between the renumber and the append that follows it
+    def renumbered(entries):
+        ledger.renumbered(entries)
+        readers.append(start(ledger.ensure_fresh))
+        readers[0].join(0.3)
+
+    storage.on_renumber = renumbered
+    storage.journal.flush()
+    readers[0].join()
+    assert sorted(ledger.frame["No"]) == [1, 2, 3]
+    assert not ledger.stale()
+
+
+def test_refresh_picks_up_an_edit_the_sample_missed():
+    book = FakeSpreadsheet([spending_row("1/6/2025", n) for n in range(1, 3001)])
+    storage = SheetsBackend(book.worksheet("My Spending Sheet"), book.worksheet("TransactionMeta"))
+    storage.journal._thread.join()
+    ledger = Ledger(storage)
+    ledger.reload()
+    book.edit("My Spending Sheet", 1501, 7, "900")
+    ledger.refresh()
+    ledger.ensure_fresh()
+    assert ledger.frame["Amount Spent"][1499] == 900
+    assert storage.spending_mirror.last_sync == "full"
+
+
+def sheets_ledger(book):
+    storage = SheetsBackend(book.worksheet("My Spending Sheet"), book.worksheet("TransactionMeta"))
+    storage.journal._thread.join()
+    storage.journal.flush_async = lambda: None
+    ledger = Ledger(storage)
+    ledger.reload()
+    return storage, ledger
+
+
+def test_rows_appended_elsewhere_are_applied_without_a_rebuild():
+    book = FakeSpreadsheet([spending_row("1/6/2025", n) for n in (1, 2)], [meta_row("1/6/2025", 1)])
+    storage, ledger = sheets_ledger(book)
+    item_index = ledger.item_index
+    book.worksheet("My Spending Sheet").append_rows([spending_row("1/6/2025", 3, item="bread")])
+    book.worksheet("TransactionMeta").append_rows([meta_row("1/6/2025", 3, location="Market")])
+    ledger.invalidate()
+    ledger.ensure_fresh()
+    assert ledger.item_index is item_index
+    assert ledger.frame["No"].tolist() == [1, 2, 3]
+    assert ledger.joined["LOCATION"].tolist()[2] == "Market"
+    assert ledger.rollup.day_count(ledger.frame["DATE"][0].date()) == 3
+
+
+def test_sent_submission_is_not_counted_twice():
+    book = FakeSpreadsheet([spending_row("1/6/2025", 1)], [meta_row("1/6/2025", 1)])
+    storage, ledger = sheets_ledger(book)
+    item_index = ledger.item_index
+    storage.append([spending_row("1/6/2025", 2)], [meta_row("1/6/2025", 2)])
+    ledger.apply([spending_row("1/6/2025", 2)], [meta_row("1/6/2025", 2)])
+    storage.journal.flush()
+    # Sent, plus one more queued by another session of the app
+    storage.append([spending_row("1/6/2025", 3)], [meta_row("1/6/2025", 3)])
+    ledger.invalidate()
+    ledger.ensure_fresh()
+    assert ledger.item_index is item_index
+    assert ledger.frame["No"].tolist() == [1, 2, 3]
+    assert len(ledger.meta_frame) == 3
+    storage.journal.flush()
+    ledger.invalidate()
+    ledger.ensure_fresh()
+    assert ledger.frame["No"].tolist() == [1, 2, 3]
@@ -0,0 +1,109 @@
+import mirror
+from fakes import FakeSpreadsheet, spending_row, meta_row, SPENDING
+from mirror import SheetMirror, sync_mirrors
+
+
+def make_mirrors(book):
+    return [SheetMirror(book.worksheet("My Spending Sheet"), SPENDING),
+            SheetMirror(book.worksheet("TransactionMeta"), ["DATE", "No", "LOCATION"])]
+
+
+def batches(book):
+    return [call for call in book.calls if call[0] == "values_batch_get"]
+
+
+def test_plan_fetches_whole_sheet_then_from_last_synced_row():
+    book = FakeSpreadsheet([spending_row("1/6/2025", n) for n in (1, 2, 3)])
+    spending = make_mirrors(book)[0]
+    assert spending._plan() == (None, "'My Spending Sheet'")
+    spending.sync()
+    frame, a1_range = spending._plan()
+    assert len(frame) == 3
+    assert a1_range == "'My Spending Sheet'!A4:I"
+
+
+def test_overlap_checks_last_row_and_samples():
+    book = FakeSpreadsheet([spending_row("1/6/2025", n) for n in (1, 2, 3)])
+    spending = make_mirrors(book)[0]
+    frame = spending.sync()
+    last = spending_row("1/6/2025", 3)
+    assert spending._overlap_ok(frame, [last])
+    assert not spending._overlap_ok(frame, [])
+    assert not spending._overlap_ok(frame, [spending_row("1/6/2025", 4)])
+    assert spending._overlap_ok(frame, [last], [2], [[spending_row("1/6/2025", 1)]])
+    assert not spending._overlap_ok(frame, [last], [2], [[spending_row("1/6/2025", 1, amount=900)]])
+
+
+def test_new_rows_come_from_one_batch():
+    book = FakeSpreadsheet([spending_row("1/6/2025", 1)], [meta_row("1/6/2025", 1)])
+    mirrors = make_mirrors(book)
+    sync_mirrors(book, mirrors)
+    book.worksheet("My Spending Sheet").append_rows([spending_row("1/6/2025", 2)])
+    book.calls.clear()
+    spending, meta = sync_mirrors(book, mirrors)
+    assert len(spending) == 2 and len(meta) == 1
+    assert [m.last_sync for m in mirrors] == ["tail", "tail"]
+    assert len(batches(book)) == 1
+    assert not [call for call in book.calls if call[0] == "get_all_values"]
+
+
+def test_unchanged_spreadsheet_skips_the_download():
+    book = FakeSpreadsheet([spending_row("1/6/2025", 1)])
+    mirrors = make_mirrors(book)
+    sync_mirrors(book, mirrors)
+    book.calls.clear()
+    sync_mirrors(book, mirrors)
+    assert [m.last_sync for m in mirrors] == ["skip", "skip"]
+    assert batches(book) == []
+
+
+def test_edit_above_the_tail_redownloads_only_that_sheet():
+    book = FakeSpreadsheet([spending_row("1/6/2025", n) for n in (1, 2, 3)], [meta_row("1/6/2025", 1)])
+    mirrors = make_mirrors(book)
+    sync_mirrors(book, mirrors)
+    book.edit("My Spending Sheet", 2, 7, "900")
+    book.calls.clear()
+    spending, _ = sync_mirrors(book, mirrors)
+    assert spending["Amount Spent"][0] == "900"
+    assert [m.last_sync for m in mirrors] == ["full", "tail"]
+    assert batches(book)[-1][1] == ("'My Spending Sheet'",)
+
+
+def test_modified_without_new_rows_or_edits_keeps_the_mirror():
+    book = FakeSpreadsheet([spending_row("1/6/2025", n) for n in range(1, 20)])
+    mirrors = make_mirrors(book)
+    sync_mirrors(book, mirrors)
+    # A formatting change bumps modifiedTime without touching any values
+    book.revision += 1
+    book.calls.clear()
+    sync_mirrors(book, mirrors)
+    assert [m.last_sync for m in mirrors] == ["tail", "tail"]
+    assert len(batches(book)) == 1
+    # Tail plus the sampled rows of each sheet
+    assert len(batches(book)[0][1]) == 2 + mirror.SAMPLE_ROWS
+
+
+def test_offline_sync_serves_the_mirror():
+    book = FakeSpreadsheet([spending_row("1/6/2025", 1)])
+    spending = make_mirrors(book)[0]
+    spending.sync()
+    book.revision += 1
+
+    def offline(ranges, params=None):
+        raise ConnectionError("offline")
+
+    book.values_batch_get = offline
+    assert len(spending.sync()) == 1
+    assert isinstance(spending.last_error, ConnectionError)
+
+
+def test_full_sync_downloads_every_sheet_in_one_batch():
+    book = FakeSpreadsheet([spending_row("1/6/2025", n) for n in range(1, 200)], [meta_row("1/6/2025", 1)])
+    mirrors = make_mirrors(book)
+    sync_mirrors(book, mirrors)
+    book.edit("My Spending Sheet", 100, 7, "900")
+    book.calls.clear()
+    spending, _ = sync_mirrors(book, mirrors, full=True)
+    assert spending["Amount Spent"][98] == "900"
+    assert [m.last_sync for m in mirrors] == ["full", "full"]
+    assert batches(book) == [("values_batch_get", ("'My Spending Sheet'", "'TransactionMeta'"))]
@@ -0,0 +1,54 @@
+import threading
+from datetime import date
+import pandas as pd
+from sequence import SequenceAllocator, renumber
+from storage import parse_sheet_date
+
+DAY = date(2025, 1, 6)
+
+
+def test_seed_uses_highest_number_per_day_and_never_lowers():
+    allocator = SequenceAllocator()
+    allocator.seed(pd.DataFrame({
+        "DATE": pd.to_datetime(["2025-01-06", "2025-01-06", "2025-01-07", None]),
+        "No": pd.array([1, 3, 2, 9], dtype="Int64"),
+    }))
+    assert allocator.allocate(DAY) == 4
+    allocator.seed(pd.DataFrame({"DATE": pd.to_datetime(["2025-01-06"]), "No": pd.array([2], dtype="Int64")}))
+    assert allocator.allocate(DAY) == 5
+    assert allocator.allocate(date(2025, 1, 7)) == 3
+
+
+def test_allocate_reserves_consecutive_block():
+    allocator = SequenceAllocator()
+    assert allocator.allocate(DAY, 3) == 1
+    assert allocator.allocate(DAY) == 4
+
+
+def test_concurrent_allocations_are_unique():
+    allocator = SequenceAllocator()
+    numbers = []
+    threads = [threading.Thread(target=lambda: numbers.append(allocator.allocate(DAY))) for _ in range(64)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(numbers) == list(range(1, 65))
+
+
+def entry(no):
+    return {"spending": ["1/6/2025", no, "10:00", "rice"], "meta": ["1/6/2025", no, "Shop"]}
+
+
+def test_renumber_moves_collisions_past_taken_numbers():
+    entries = [entry(2), entry(3), entry(3)]
+    changed = renumber(entries, {DAY: {1, 2}}, parse_sheet_date)
+    assert [e["spending"][1] for e in entries] == [4, 3, 5]
+    assert [e["meta"][1] for e in entries] == [4, 3, 5]
+    assert changed == [entries[0], entries[2]]
+
+
+def test_renumber_leaves_free_numbers_alone():
+    entries = [entry(5)]
+    assert renumber(entries, {DAY: {1, 2}}, parse_sheet_date) == []
+    assert entries[0]["spending"][1] == 5
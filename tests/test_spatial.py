@@ -0,0 +1,66 @@
+import math
+import pandas as pd
+from spatial import METERS_PER_DEGREE, PlaceIndex, _cell_keys, cell_size, find_hotspots
+
+
+def points(fixes):
+    return pd.DataFrame([
+        {"LAT": lat, "LON": lon, "LOCATION": location, "Amount Spent": 100.0, "DATE": pd.Timestamp("2025-06-01")}
+        for lat, lon, location in fixes
+    ])
+
+
+def east(lat, lon, metres):
+    return lon + metres / (METERS_PER_DEGREE * math.cos(math.radians(lat)))
+
+
+def test_cells_are_as_wide_on_the_ground_at_high_latitude():
+    size = cell_size(14)
+    cell_m = size * METERS_PER_DEGREE
+    for lat in (0.0, 60.0):
+        line = points([(lat + size / 2, east(lat, 0.0, m), "") for m in range(0, 2000, 10)])
+        _, cell_lon = _cell_keys(line, size)
+        assert abs(cell_lon.nunique() - 2000 / cell_m) <= 1.5
+
+
+def test_hotspot_split_by_a_cell_edge_is_one_place():
+    size = cell_size(14)
+    # A cell edge: columns are counted in longitude scaled by cos(lat) of the row
+    row = math.floor(6.5 / size)
+    lat, scale = (row + 0.5) * size, math.cos(math.radians((row + 0.5) * size))
+    edge = math.floor(3.3 * scale / size) * size / scale
+    fixes = [(lat, edge - size * 0.05, "Market")] * 3 + [(lat, edge + size * 0.05, "market")] * 2
+    fixes += [(lat + 20 * size, 3.3, "Home")] * 4
+    hotspots = find_hotspots(points(fixes))
+    assert hotspots["Visit Count"].tolist() == [5, 4]
+    assert hotspots["LOCATION"].tolist() == ["Market", "Home"]
+    assert hotspots["Total Spent"].tolist() == [500.0, 400.0]
+
+
+def test_no_fixes_no_hotspots():
+    assert find_hotspots(points([]).reindex(columns=["LAT", "LON", "LOCATION", "Amount Spent", "DATE"])).empty
+
+
+def meta(fixes):
+    return pd.DataFrame(fixes, columns=["LAT", "LON", "LOCATION"])
+
+
+def test_nearest_place_within_radius():
+    index = PlaceIndex.from_frame(meta([(6.5, 3.3, "Shop"), (6.51, 3.3, "Office"), (6.5, 3.3, None)]))
+    place, distance = index.nearest(6.5005, 3.3)
+    assert place == "Shop" and 50 < distance < 60
+    assert index.nearest(6.505, 3.3) is None
+    assert index.nearest(None, 3.3) is None
+
+
+def test_nearest_place_looks_far_enough_east_at_high_latitude():
+    lat = 70.0
+    index = PlaceIndex.from_frame(meta([(lat, east(lat, 10.0, 140), "Cabin")]))
+    assert index.nearest(lat, 10.0)[0] == "Cabin"
+
+
+def test_more_visited_label_wins_and_added_fixes_count():
+    index = PlaceIndex.from_frame(meta([(6.5, 3.3, "Shop"), (6.5, 3.3, "Kiosk"), (6.5, 3.3, "Kiosk")]))
+    assert index.nearest(6.5, 3.3)[0] == "Kiosk"
+    index.add_frame(meta([(6.5, 3.3, "Shop")] * 2))
+    assert index.nearest(6.5, 3.3)[0] == "Shop"